@@ -4,36 +4,87 @@ app.py — FastAPI backend for the Semantic Search Engine.
 Endpoints
 ---------
 POST /search   — query text → Top-5 results
+POST /search/batch — many queries (modes may differ) → results per query, one Qdrant round-trip
 POST /add      — new text → embed & upsert
-GET  /points   — all points (for visualization)
+GET  /points   — stream points as NDJSON or Arrow IPC (cursor, page_size, limit, with_vectors)
+GET  /projection — 2D/3D PCA / random / UMAP coordinates of (a sample of) the points
 GET  /health   — health check
+GET  /ready    — 200 once warm-up has completed, 503 before
+GET  /metrics  — load timings, inference queue depth, batch-size histograms
+GET  /admin/query_cache    — query-embedding cache stats
+DELETE /admin/query_cache  — flush the query-embedding cache
 """
 
+import asyncio
+import uuid
 from contextlib import asynccontextmanager
+from typing import AsyncIterator, Literal
 
-from fastapi import FastAPI
+import httpx
+from fastapi import FastAPI, File, HTTPException, Query, UploadFile
+from fastapi.responses import JSONResponse, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
 
 import config
+import metrics
 import model_loader
 import database_manager
+import point_export
+import projection
 import search_engine
+import worker_pool
+
+
+# ── Readiness ────────────────────────────────────────────
+# /health answers as soon as the process is up; /ready only once warm-up has
+# run every hot path, so load balancers hold traffic until first requests are fast.
+_readiness: dict = {"ready": False, "warmup": None, "error": None}
+
+
+async def _warm_up() -> None:
+    while True:
+        try:
+            timings = await asyncio.to_thread(search_engine.warm_up)
+            timings |= await search_engine.warm_up_async()
+        except Exception as e:
+            _readiness["error"] = str(e)
+            print(f"[app] Warm-up failed, retrying in {config.WARMUP_RETRY_SECONDS}s: {e}")
+            await asyncio.sleep(config.WARMUP_RETRY_SECONDS)
+            continue
+        _readiness.update(ready=True, warmup=timings, error=None)
+        print(f"[app] Warm-up complete: {timings}")
+        return
 
 
 # ── Lifespan: warm up model & DB on startup ─────────────
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Startup
-    if not config.USE_TEI:
+    if config.EMBED_WORKERS > 0:
+        worker_pool.start()                 # models load inside the worker processes
+    elif config.ENCODER_MODE == "bge-m3":
+        model_loader.get_bge_m3_model()     # one model serves dense + lexical heads
+    elif not config.USE_TEI:
         model_loader.get_dense_model()      # pre-load dense model (BGE-M3) locally
-    else:
+    if config.USE_TEI:
         print(f"[app] Using remote TEI server: {config.TEI_URL}")
-        
-    model_loader.get_sparse_model()     # pre-load sparse model (BM25)
+
+    if config.EMBED_WORKERS == 0 and config.ENCODER_MODE != "bge-m3":
+        model_loader.get_sparse_model()     # pre-load sparse model (BM25)
     database_manager.ensure_collection()
+    warmup_task = None
+    if config.WARMUP_ENABLED:
+        warmup_task = asyncio.create_task(_warm_up())
+    else:
+        _readiness["ready"] = True
     yield
-    # Shutdown (nothing to clean up)
+    # Shutdown
+    if warmup_task is not None:
+        warmup_task.cancel()
+    await model_loader.close_tei_clients()
+    await database_manager.close_async_client()
+    worker_pool.shutdown()
 
 
 app = FastAPI(title="Semantic Search Engine", lifespan=lifespan)
@@ -48,20 +99,70 @@ app.add_middleware(
 
 
 # ── Schemas ──────────────────────────────────────────────
+class RangeSpec(BaseModel):
+    gt: float | None = None
+    gte: float | None = None
+    lt: float | None = None
+    lte: float | None = None
+
+
+class Condition(BaseModel):
+    key: str                                  # dotted payload key, e.g. 'en.brand'
+    match: str | int | bool | None = None     # exact value
+    any: list[str | int] | None = None        # any of these values
+    range: RangeSpec | None = None            # numeric bounds
+
+
+class SearchFilter(BaseModel):
+    must: list[Condition] = []
+    should: list[Condition] = []
+    must_not: list[Condition] = []
+
+
 class SearchRequest(BaseModel):
     query: str
     top_k: int | None = None
-    mode: str | None = None  # 'dense', 'sparse'
+    mode: Literal["dense", "sparse", "hybrid"] | None = None
+    # Payload returned per hit: a config.PAYLOAD_PROFILES name, or explicit
+    # (dotted) keys to include / exclude. Unset = DEFAULT_PAYLOAD_PROFILE.
+    payload_profile: str | None = None
+    payload_include: list[str] | None = None
+    payload_exclude: list[str] | None = None
+    filter: SearchFilter | None = None        # applied by Qdrant (indexed fields: config.PAYLOAD_INDEXES)
+
+
+class BatchSearchRequest(BaseModel):
+    queries: list[SearchRequest]
 
 
 class AddRequest(BaseModel):
     text: str
 
 
+def _payload_selector(req: SearchRequest) -> database_manager.PayloadSelection:
+    try:
+        return database_manager.payload_selector(req.payload_profile, req.payload_include, req.payload_exclude)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+def _filter_spec(req: SearchRequest) -> dict | None:
+    if req.filter is None:
+        return None
+    spec = req.filter.model_dump(exclude_none=True)
+    try:
+        database_manager.build_filter(spec)     # validate up front: 400, not 500
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return spec
+
+
 # ── Endpoints ────────────────────────────────────────────
+# Network-bound endpoints are async end to end (AsyncQdrantClient, async TEI);
+# CPU-bound encoding is handed to threads inside search_engine / model_loader.
 @app.get("/health")
-def health():
-    count = database_manager.collection_count()
+async def health():
+    count = await database_manager.collection_count_async()
     return {
         "status": "ok", 
         "collection": config.COLLECTION_NAME, 
@@ -70,10 +171,22 @@ def health():
     }
 
 
+@app.get("/ready")
+def ready():
+    if _readiness["ready"]:
+        return {"status": "ready", "warmup": _readiness["warmup"]}
+    return JSONResponse(
+        status_code=503,
+        content={"status": "warming_up", "error": _readiness["error"]},
+    )
+
+
 @app.post("/search")
-def do_search(req: SearchRequest):
+async def do_search(req: SearchRequest):
     # Pass mode if provided, else use config default inside search_engine
-    results, query_vector = search_engine.search(req.query, req.top_k, req.mode)
+    results, query_vector = await search_engine.search_async(
+        req.query, req.top_k, req.mode, _payload_selector(req), _filter_spec(req)
+    )
     
     # Handle serialization (SparseVector is not JSON serializable directly)
     vec_out = query_vector.tolist() if hasattr(query_vector, "tolist") else "sparse_vector"
@@ -85,51 +198,122 @@ def do_search(req: SearchRequest):
     }
 
 
+@app.post("/search/batch")
+async def do_search_batch(req: BatchSearchRequest):
+    if len(req.queries) > config.SEARCH_BATCH_MAX_QUERIES:
+        raise HTTPException(status_code=413, detail=f"At most {config.SEARCH_BATCH_MAX_QUERIES} queries per batch")
+    results = await search_engine.search_many_async(
+        [q.query for q in req.queries],
+        [q.mode for q in req.queries],
+        [q.top_k for q in req.queries],
+        [_payload_selector(q) for q in req.queries],
+        [_filter_spec(q) for q in req.queries],
+    )
+    return {
+        "results": [
+            {"query": q.query, "mode": q.mode or config.SEARCH_MODE, "results": hits}
+            for q, hits in zip(req.queries, results)
+        ]
+    }
+
+
+@app.get("/metrics")
+def get_metrics():
+    return metrics.snapshot()
+
+
+@app.get("/admin/query_cache")
+def query_cache_stats():
+    return search_engine.query_cache_stats()
+
+
+@app.delete("/admin/query_cache")
+def flush_query_cache():
+    removed = search_engine.clear_query_cache()
+    return {"status": "flushed", "removed": removed}
+
+
 @app.post("/add")
-def add_document(req: AddRequest):
-    uid = search_engine.add_document(req.text)
+async def add_document(req: AddRequest):
+    uid = await search_engine.add_document_async(req.text)
     return {"id": uid, "text": req.text}
 
 
-from fastapi import UploadFile, File
-import shutil
-import os
+_UPLOAD_CHUNK_BYTES = 1 << 20   # snapshot bytes read per await while forwarding
+
+
+async def _multipart_file(file: UploadFile, field: str, boundary: str) -> AsyncIterator[bytes]:
+    """multipart/form-data body for one file, read with `await file.read()` so the loop never blocks."""
+    filename = (file.filename or field).replace('"', "%22")
+    yield (
+        f'--{boundary}\r\nContent-Disposition: form-data; name="{field}"; filename="{filename}"\r\n'
+        f"Content-Type: application/octet-stream\r\n\r\n"
+    ).encode()
+    while chunk := await file.read(_UPLOAD_CHUNK_BYTES):
+        yield chunk
+    yield f"\r\n--{boundary}--\r\n".encode()
+
 
 @app.post("/upload_snapshot")
 async def upload_snapshot(file: UploadFile = File(...)):
-    """Temporarily save snapshot and ask database_manager to restore it."""
+    """Forward an uploaded snapshot to Qdrant's snapshot-restore endpoint."""
     try:
-        # Save temp file
-        temp_path = f"/tmp/{file.filename}"
-        with open(temp_path, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
-            
-        print(f"Snapshot received: {temp_path}")
-        
-        # We will use requests to forward it locally to Qdrant inside the docker network
-        import requests
-        qdrant_url = f"http://{config.QDRANT_HOST}:6333"
+        print(f"Snapshot received: {file.filename}")
+
+        # Stream the spooled upload straight to Qdrant inside the docker network
+        qdrant_url = f"http://{config.QDRANT_HOST}:{config.QDRANT_PORT}"
         restore_endpoint = f"{qdrant_url}/collections/{config.COLLECTION_NAME}/snapshots/upload"
-        
-        with open(temp_path, "rb") as f:
-            res = requests.post(restore_endpoint, files={"snapshot": f})
-            
-        # Clean up temp file
-        os.remove(temp_path)
-        
+
+        boundary = uuid.uuid4().hex
+        async with httpx.AsyncClient(timeout=httpx.Timeout(config.QDRANT_TIMEOUT, read=None)) as client:
+            res = await client.post(
+                restore_endpoint,
+                content=_multipart_file(file, "snapshot", boundary),
+                headers={"Content-Type": f"multipart/form-data; boundary={boundary}"},
+            )
+
         if res.status_code == 200:
             return {"status": "success", "message": "Snapshot restored successfully!"}
         else:
             return {"status": "error", "message": res.text}
-            
+
     except Exception as e:
         return {"status": "error", "message": str(e)}
 
 
 @app.get("/points")
-def get_points():
-    points = database_manager.get_all_points()
-    return {"count": len(points), "points": points}
+def get_points(
+    format: str = Query("ndjson", pattern="^(ndjson|arrow)$"),
+    cursor: str | None = None,
+    page_size: int | None = Query(None, ge=1, le=config.POINTS_MAX_PAGE_SIZE),
+    limit: int | None = Query(None, ge=1),
+    with_vectors: bool = False,
+):
+    """
+    Stream points page by page; every page carries its next_cursor (an NDJSON
+    line / Arrow batch metadata). Resume an interrupted export by passing the
+    last one received back as `cursor`; without `limit` the whole collection is sent.
+    """
+    pages = database_manager.iter_points(page_size, with_vectors, point_export.parse_cursor(cursor), limit)
+    if format == "arrow":
+        if not point_export.arrow_available():
+            raise HTTPException(status_code=501, detail="Arrow output needs 'pyarrow' (pip install pyarrow)")
+        return StreamingResponse(point_export.arrow_stream(pages, with_vectors), media_type=point_export.ARROW_MEDIA_TYPE)
+    return StreamingResponse(point_export.ndjson_stream(pages), media_type=point_export.NDJSON_MEDIA_TYPE)
+
+
+@app.get("/projection")
+def get_projection(
+    method: str | None = Query(None, pattern="^(pca|random|umap)$"),
+    dims: int = Query(2, ge=2, le=3),
+    sample: int | None = Query(None, ge=1),
+    stratify: str | None = None,
+):
+    """Projected coordinates for visualisation; ids + coords + a few payload fields only."""
+    try:
+        return projection.project(method, dims, sample, stratify)
+    except RuntimeError as e:
+        raise HTTPException(status_code=501, detail=str(e))
 
 
 # ── Run directly ─────────────────────────────────────────
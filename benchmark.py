@@ -0,0 +1,293 @@
+"""
+benchmark.py — Performance benchmarks for the Semantic Search Engine.
+
+Usage
+-----
+python benchmark.py dense-backends [--texts FILE] [--n 512] [--runs 50]
+    Compare the local dense backends (torch fp32/fp16, ONNX, ONNX int8) on
+    single-query latency, batch throughput and cosine agreement with torch.
+
+python benchmark.py imports [--max-seconds 2.0] [--max-rss-mb 400]
+    Import-time and peak-RSS check for each module in a fresh interpreter
+    with USE_TEI=True. Exits non-zero if torch, sentence_transformers or
+    fastembed get imported, or if a budget is exceeded.
+
+python benchmark.py singletons [--threads 32]
+    Call every lazily loaded singleton (dense, sparse and BGE-M3 models, the
+    Qdrant client) from N threads released by one barrier, with the
+    constructors stubbed by slow fakes. Exits non-zero unless each was
+    constructed exactly once and every thread got the same object.
+
+python benchmark.py transport [--points 20000] [--runs 200]
+    REST vs gRPC Qdrant client on dense search, sparse search, bulk upsert
+    and a full scroll with vectors, against a scratch collection.
+"""
+
+import argparse
+import json
+import os
+import random
+import statistics
+import subprocess
+import sys
+import threading
+import time
+from types import SimpleNamespace
+
+import numpy as np
+
+import config
+import database_manager
+import model_loader
+
+_WORDS = (
+    "winter gloves men women leather waterproof touchscreen wool lined iphone case "
+    "silicone shockproof clear slim wireless charger fast usb cable running shoes "
+    "lightweight breathable mesh cotton t-shirt crew neck stainless steel water bottle "
+    "insulated vacuum kitchen knife set chef ceramic nonstick frying pan induction"
+).split()
+
+
+def _load_texts(path: str | None, n: int) -> list[str]:
+    """Texts from a file (one per line) or synthetic product titles/descriptions of mixed length."""
+    if path:
+        with open(path, encoding="utf-8") as f:
+            texts = [line.strip() for line in f if line.strip()]
+        return texts[:n]
+    rng = random.Random(0)
+    return [" ".join(rng.choices(_WORDS, k=rng.choice((3, 6, 12, 40, 120)))) for _ in range(n)]
+
+
+def _percentile(values: list[float], q: float) -> float:
+    return float(np.percentile(values, q)) if values else 0.0
+
+
+def _embed(model, texts: list[str]) -> np.ndarray:
+    return model.encode(texts, batch_size=config.BATCH_SIZE, normalize_embeddings=True, convert_to_numpy=True).astype(np.float32)
+
+
+def bench_dense_backends(args: argparse.Namespace) -> None:
+    texts = _load_texts(args.texts, args.n)
+    queries = texts[: args.runs]
+    variants = [("torch", False), ("onnx", False), ("onnx", True)]
+
+    reference: np.ndarray | None = None
+    print(f"{'backend':<16}{'load s':>8}{'p50 ms':>9}{'p95 ms':>9}{'docs/s':>10}{'cos mean':>10}{'cos min':>9}")
+    for backend, quantize in variants:
+        name = f"{backend}{'-int8' if quantize else ''}"
+        t0 = time.perf_counter()
+        model = model_loader.load_dense_model(backend, quantize)
+        load_s = time.perf_counter() - t0
+
+        _embed(model, queries[:4])  # warm-up
+        latencies = []
+        for q in queries:
+            t0 = time.perf_counter()
+            _embed(model, [q])
+            latencies.append((time.perf_counter() - t0) * 1000)
+
+        t0 = time.perf_counter()
+        emb = _embed(model, texts)
+        throughput = len(texts) / (time.perf_counter() - t0)
+
+        if reference is None:
+            reference = emb
+        cos = np.sum(reference * emb, axis=1)
+        print(
+            f"{name:<16}{load_s:>8.1f}{statistics.median(latencies):>9.1f}{_percentile(latencies, 95):>9.1f}"
+            f"{throughput:>10.1f}{cos.mean():>10.4f}{cos.min():>9.4f}"
+        )
+        del model
+
+
+_HEAVY_MODULES = ("torch", "sentence_transformers", "fastembed")
+_IMPORT_PROBE = """
+import json, resource, sys, time
+t0 = time.perf_counter()
+import {module}
+seconds = time.perf_counter() - t0
+try:  # VmHWM is reset on exec; ru_maxrss can carry over the parent's peak
+    with open("/proc/self/status") as f:
+        rss_mb = next(int(l.split()[1]) for l in f if l.startswith("VmHWM")) / 1024
+except OSError:
+    rss_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+print(json.dumps({{
+    "seconds": seconds,
+    "rss_mb": rss_mb,
+    "heavy": [m for m in {heavy!r} if m in sys.modules],
+}}))
+"""
+
+
+def bench_imports(args: argparse.Namespace) -> None:
+    env = dict(os.environ, USE_TEI="True")
+    failed = False
+    print(f"{'module':<16}{'import s':>10}{'peak RSS MB':>13}  heavy imports")
+    for module in args.modules:
+        probe = _IMPORT_PROBE.format(module=module, heavy=_HEAVY_MODULES)
+        out = subprocess.run(
+            [sys.executable, "-c", probe],
+            env=env, capture_output=True, text=True,
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+        )
+        if out.returncode != 0:
+            print(f"{module:<16}import failed:\n{out.stderr}")
+            failed = True
+            continue
+        r = json.loads(out.stdout.strip().splitlines()[-1])
+        print(f"{module:<16}{r['seconds']:>10.2f}{r['rss_mb']:>13.0f}  {', '.join(r['heavy']) or '-'}")
+        if r["heavy"] or r["seconds"] > args.max_seconds or r["rss_mb"] > args.max_rss_mb:
+            failed = True
+    if failed:
+        print("FAIL: heavy backend imported at module load, or import budget exceeded.")
+        sys.exit(1)
+
+
+def _slow_fake(seconds: float):
+    """Stand-in constructor: slow enough that racing threads overlap inside it."""
+    def build(*args, **kwargs):
+        time.sleep(seconds)
+        return SimpleNamespace()
+    return build
+
+
+def bench_singletons(args: argparse.Namespace) -> None:
+    import metrics
+
+    model_loader.load_dense_model = _slow_fake(args.load_seconds)
+    model_loader._load_sparse_model = _slow_fake(args.load_seconds)
+    model_loader._load_bge_m3_model = _slow_fake(args.load_seconds)
+    database_manager.build_client = _slow_fake(args.load_seconds)
+    singletons = {
+        "dense_model": model_loader.get_dense_model,
+        "sparse_model": model_loader.get_sparse_model,
+        "bge_m3_model": model_loader.get_bge_m3_model,
+        "qdrant_client": database_manager.get_client,
+    }
+
+    failed = False
+    print(f"{'singleton':<16}{'threads':>8}{'loads':>7}{'distinct objects':>18}")
+    for name, getter in singletons.items():
+        barrier = threading.Barrier(args.threads)
+        results: list = [None] * args.threads
+
+        def call(i: int) -> None:
+            barrier.wait()
+            results[i] = getter()
+
+        threads = [threading.Thread(target=call, args=(i,)) for i in range(args.threads)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        loads = metrics.load_count(name)
+        distinct = len({id(r) for r in results})
+        print(f"{name:<16}{args.threads:>8}{loads:>7}{distinct:>18}")
+        if loads != 1 or distinct != 1 or results[0] is None:
+            failed = True
+    if failed:
+        print("FAIL: a singleton was constructed more than once under concurrent first use.")
+        sys.exit(1)
+
+
+def _random_points(n: int, dim: int, rng: np.random.Generator) -> list:
+    from qdrant_client.models import PointStruct, SparseVector
+
+    dense = rng.standard_normal((n, dim), dtype=np.float32)
+    dense /= np.linalg.norm(dense, axis=1, keepdims=True)
+    points = []
+    for i in range(n):
+        idx = np.unique(rng.integers(0, 30000, size=12))
+        points.append(PointStruct(
+            id=i,
+            vector={"text": dense[i].tolist(), config.SPARSE_VECTOR_NAME: SparseVector(indices=idx.tolist(), values=rng.random(len(idx)).tolist())},
+            payload={"en": {"name": f"product {i}", "price": float(i % 500)}},
+        ))
+    return points
+
+
+def bench_transport(args: argparse.Namespace) -> None:
+    from qdrant_client.models import Distance, SparseVector, SparseVectorParams, VectorParams
+
+    collection = f"{config.COLLECTION_NAME}_bench_transport"
+    rng = np.random.default_rng(0)
+    points = _random_points(args.points, config.EMBEDDING_DIM, rng)
+    queries = rng.standard_normal((args.runs, config.EMBEDDING_DIM), dtype=np.float32)
+    sparse_queries = []
+    for _ in range(args.runs):
+        idx = np.unique(rng.integers(0, 30000, size=4)).tolist()
+        sparse_queries.append(SparseVector(indices=idx, values=[1.0] * len(idx)))
+
+    print(f"{'transport':<10}{'upsert pts/s':>14}{'dense p50 ms':>14}{'sparse p50 ms':>15}{'scroll pts/s':>14}")
+    for transport in ("rest", "grpc"):
+        client = database_manager.build_client(prefer_grpc=transport == "grpc")
+        if client.collection_exists(collection):
+            client.delete_collection(collection)
+        client.create_collection(
+            collection_name=collection,
+            vectors_config={"text": VectorParams(size=config.EMBEDDING_DIM, distance=Distance.COSINE)},
+            sparse_vectors_config={config.SPARSE_VECTOR_NAME: SparseVectorParams()},
+        )
+
+        t0 = time.perf_counter()
+        client.upload_points(collection, points, batch_size=config.UPSERT_BATCH_SIZE, wait=True)
+        upsert_rate = len(points) / (time.perf_counter() - t0)
+
+        dense_ms, sparse_ms = [], []
+        for q, sq in zip(queries, sparse_queries):
+            t0 = time.perf_counter()
+            client.query_points(collection, query=q.tolist(), using="text", limit=config.TOP_K)
+            dense_ms.append((time.perf_counter() - t0) * 1000)
+            t0 = time.perf_counter()
+            client.query_points(collection, query=sq, using=config.SPARSE_VECTOR_NAME, limit=config.TOP_K)
+            sparse_ms.append((time.perf_counter() - t0) * 1000)
+
+        t0 = time.perf_counter()
+        scrolled, offset = 0, None
+        while True:
+            records, offset = client.scroll(collection, limit=1000, offset=offset, with_vectors=["text"], with_payload=True)
+            scrolled += len(records)
+            if offset is None:
+                break
+        scroll_rate = scrolled / (time.perf_counter() - t0)
+
+        client.delete_collection(collection)
+        client.close()
+        print(
+            f"{transport:<10}{upsert_rate:>14,.0f}{statistics.median(dense_ms):>14.2f}"
+            f"{statistics.median(sparse_ms):>15.2f}{scroll_rate:>14,.0f}"
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Semantic Search Engine benchmarks")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("dense-backends", help="torch vs ONNX vs ONNX int8 for the local dense model")
+    p.add_argument("--texts", help="file with one text per line (default: synthetic product texts)")
+    p.add_argument("--n", type=int, default=512, help="texts for the throughput run")
+    p.add_argument("--runs", type=int, default=50, help="single-query latency samples")
+    p.set_defaults(func=bench_dense_backends)
+
+    p = sub.add_parser("imports", help="import time / RSS of the API modules in TEI mode")
+    p.add_argument("--modules", nargs="+", default=["config", "model_loader", "search_engine", "app"])
+    p.add_argument("--max-seconds", type=float, default=2.0, help="per-module import-time budget")
+    p.add_argument("--max-rss-mb", type=float, default=400, help="per-module peak RSS budget")
+    p.set_defaults(func=bench_imports)
+
+    p = sub.add_parser("singletons", help="single-flight check of the lazily loaded singletons")
+    p.add_argument("--threads", type=int, default=32, help="threads racing for each singleton")
+    p.add_argument("--load-seconds", type=float, default=0.2, help="duration of each stubbed constructor")
+    p.set_defaults(func=bench_singletons)
+
+    p = sub.add_parser("transport", help="REST vs gRPC Qdrant client")
+    p.add_argument("--points", type=int, default=20000, help="points to upsert / scroll")
+    p.add_argument("--runs", type=int, default=200, help="searches per mode")
+    p.set_defaults(func=bench_transport)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
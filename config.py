@@ -4,32 +4,172 @@ All tunable parameters live here.
 """
 
 import os
-import torch
 
 # ── TEI (Text Embeddings Inference) ────────────────────
 USE_TEI = os.getenv("USE_TEI", "True").lower() in ("true", "1", "yes")
 TEI_URL = os.getenv("TEI_URL", "http://8.211.22.117:9090/embed")
+TEI_POOL_SIZE = int(os.getenv("TEI_POOL_SIZE", "32"))                 # max pooled keep-alive connections
+TEI_CONNECT_TIMEOUT = float(os.getenv("TEI_CONNECT_TIMEOUT", "3.05"))  # seconds
+TEI_READ_TIMEOUT = float(os.getenv("TEI_READ_TIMEOUT", "30"))          # seconds
+TEI_KEEPALIVE_EXPIRY = float(os.getenv("TEI_KEEPALIVE_EXPIRY", "60"))  # idle seconds before a connection is dropped
+TEI_CHUNK_SIZE = int(os.getenv("TEI_CHUNK_SIZE", "32"))                # texts per request (TEI --max-client-batch-size)
+TEI_MAX_CONCURRENCY = int(os.getenv("TEI_MAX_CONCURRENCY", "4"))       # chunk requests in flight per encode call (sync and async)
+TEI_MAX_RETRIES = int(os.getenv("TEI_MAX_RETRIES", "3"))               # per chunk, on 429 / 5xx / connection errors
+TEI_RETRY_BACKOFF = float(os.getenv("TEI_RETRY_BACKOFF", "0.5"))       # seconds, doubled per attempt (full jitter)
 
 # ── Qdrant ──────────────────────────────────────────────
 QDRANT_HOST = os.getenv("QDRANT_HOST", "localhost")
 QDRANT_PORT = 6333
+QDRANT_GRPC_PORT = int(os.getenv("QDRANT_GRPC_PORT", "6334"))
+QDRANT_PREFER_GRPC = os.getenv("QDRANT_PREFER_GRPC", "False").lower() in ("true", "1", "yes")  # binary protobuf instead of JSON
+QDRANT_TIMEOUT = int(os.getenv("QDRANT_TIMEOUT", "30"))                        # seconds, both transports
+QDRANT_GRPC_MAX_MESSAGE_MB = int(os.getenv("QDRANT_GRPC_MAX_MESSAGE_MB", "64"))  # large upsert / scroll pages
+QDRANT_GRPC_KEEPALIVE_MS = int(os.getenv("QDRANT_GRPC_KEEPALIVE_MS", "30000"))
 COLLECTION_NAME = "products"
 
+# Collection storage profiles (ensure_collection / migrate_collection.py). Per
+# dense vector: where originals live, quantization, HNSW graph shape; at search
+# time: hnsw_ef and quantized-search rescoring with oversampling.
+COLLECTION_PROFILE = os.getenv("COLLECTION_PROFILE", "ram-fast")
+COLLECTION_PROFILES = {
+    # Everything in RAM, no quantization: lowest latency, ~2 KB/vector + graph
+    "ram-fast": {
+        "on_disk": False, "quantization": None, "hnsw_m": 16, "hnsw_ef_construct": 100, "hnsw_on_disk": False,
+        "hnsw_ef": 128, "rescore": False, "oversampling": None, "on_disk_payload": False,
+    },
+    # int8 copies in RAM (4x smaller), float32 originals on disk for rescoring
+    "int8-scalar": {
+        "on_disk": True, "quantization": "int8", "hnsw_m": 16, "hnsw_ef_construct": 100, "hnsw_on_disk": False,
+        "hnsw_ef": 128, "rescore": True, "oversampling": 2.0, "on_disk_payload": True,
+    },
+    # 1-bit copies in RAM (32x smaller), heavier oversampling + rescoring against disk originals
+    "binary+rescore": {
+        "on_disk": True, "quantization": "binary", "hnsw_m": 16, "hnsw_ef_construct": 100, "hnsw_on_disk": False,
+        "hnsw_ef": 128, "rescore": True, "oversampling": 3.0, "on_disk_payload": True,
+    },
+    # Vectors, graph and payload all on disk: largest collections, page-cache bound
+    "on-disk": {
+        "on_disk": True, "quantization": None, "hnsw_m": 16, "hnsw_ef_construct": 100, "hnsw_on_disk": True,
+        "hnsw_ef": 64, "rescore": False, "oversampling": None, "on_disk_payload": True,
+    },
+}
+
+UPSERT_BATCH_SIZE = int(os.getenv("UPSERT_BATCH_SIZE", "256"))   # points per upload request
+UPSERT_PARALLEL = int(os.getenv("UPSERT_PARALLEL", "1"))         # >1 starts a process pool per upload call
+UPSERT_MAX_RETRIES = int(os.getenv("UPSERT_MAX_RETRIES", "3"))   # per failed batch
+
 # ── Embedding Model ────────────────────────────────────
 MODEL_NAME = "BAAI/bge-m3"
 EMBEDDING_DIM = 512           # snapshot uses 512-dim dense vectors (named "text")
+SPARSE_MODEL_NAME = "Qdrant/bm25"   # FastEmbed sparse model (ENCODER_MODE='separate')
+
+# 'separate': dense model (TEI / local) + FastEmbed BM25, two model invocations.
+# 'bge-m3':   one local BGE-M3 forward pass yields dense + lexical (+ ColBERT) heads.
+ENCODER_MODE = os.getenv("ENCODER_MODE", "separate")
+# BM25 and BGE-M3 lexical weights use different vocabularies, so each gets its own named sparse vector
+SPARSE_VECTOR_NAME = "bge_m3_lexical" if ENCODER_MODE == "bge-m3" else "bm25"
+SPARSE_ENCODER_ID = f"{MODEL_NAME}#lexical" if ENCODER_MODE == "bge-m3" else SPARSE_MODEL_NAME
 
 # ── Device & Precision ─────────────────────────────────
-DEVICE = "cuda" if torch.cuda.is_available() else "cpu"
-TORCH_DTYPE = torch.float16   # fp16 for 8 GB VRAM optimisation
+# DEVICE and TORCH_DTYPE are resolved lazily (see __getattr__ below) so that
+# importing config never pulls in torch — TEI-mode workers don't need it.
+DENSE_BACKEND = os.getenv("DENSE_BACKEND", "torch")   # local dense model: 'torch' or 'onnx' (ONNX Runtime, CPU)
+ONNX_QUANTIZE = os.getenv("ONNX_QUANTIZE", "False").lower() in ("true", "1", "yes")  # dynamic int8 quantisation
+ONNX_QUANT_CONFIG = os.getenv("ONNX_QUANT_CONFIG", "avx512_vnni")  # 'arm64', 'avx2', 'avx512', 'avx512_vnni'
+ONNX_EXPORT_DIR = os.getenv("ONNX_EXPORT_DIR", "onnx_models")
+
+# ── Embedding Worker Pool (local CPU encoding in N processes) ─
+EMBED_WORKERS = int(os.getenv("EMBED_WORKERS", "0"))                  # 0 = encode in the API process
+EMBED_WORKER_THREADS = int(os.getenv("EMBED_WORKER_THREADS", "0"))    # intra-op threads per worker, 0 = cores / workers
+EMBED_WORKER_CHUNK = int(os.getenv("EMBED_WORKER_CHUNK", "64"))       # max texts per worker task
+
+# ── Continuous Batching (local dense model) ────────────
+# One background loop batches all local dense encodes up to DENSE_TOKEN_BUDGET,
+# interactive queries ahead of bulk ingestion. Supersedes query coalescing locally.
+INFERENCE_LOOP_ENABLED = os.getenv("INFERENCE_LOOP_ENABLED", "False").lower() in ("true", "1", "yes")
+INFERENCE_MAX_BATCH = int(os.getenv("INFERENCE_MAX_BATCH", "64"))
+
+# ── Query Coalescing ───────────────────────────────────
+DENSE_COALESCE_WINDOW_MS = float(os.getenv("DENSE_COALESCE_WINDOW_MS", "3"))  # 0 disables
+DENSE_COALESCE_MAX_BATCH = int(os.getenv("DENSE_COALESCE_MAX_BATCH", "64"))
+
+# ── Query Embedding Cache ──────────────────────────────
+QUERY_CACHE_SIZE = int(os.getenv("QUERY_CACHE_SIZE", "10000"))         # entries, 0 disables
+QUERY_CACHE_TTL = float(os.getenv("QUERY_CACHE_TTL", "3600"))          # seconds, 0 = no expiry
+
+# ── Document Embedding Store (on-disk, keyed by content hash) ─
+EMBEDDING_STORE_DIR = os.getenv("EMBEDDING_STORE_DIR", "embedding_store")   # "" disables
+EMBEDDING_STORE_DTYPE = os.getenv("EMBEDDING_STORE_DTYPE", "float16")       # 'float16' or 'float32'
 
 # ── Batch / Search ─────────────────────────────────────
 BATCH_SIZE = 32               # ingestion batch size
-# ── Batch / Search ─────────────────────────────────────
-BATCH_SIZE = 32               # ingestion batch size
+DENSE_MAX_SEQ_LENGTH = int(os.getenv("DENSE_MAX_SEQ_LENGTH", "512"))  # tokens; longer texts are truncated
+DENSE_TOKEN_BUDGET = int(os.getenv("DENSE_TOKEN_BUDGET", "16384"))    # max padded tokens per local batch
+DENSE_MAX_BATCH = int(os.getenv("DENSE_MAX_BATCH", "256"))            # row cap per token-budget batch
+SPARSE_BATCH_SIZE = int(os.getenv("SPARSE_BATCH_SIZE", "256"))  # texts per BM25 ONNX batch
+# FastEmbed `parallel`: unset = in-process, 0 = one worker per core, N = N worker processes
+SPARSE_PARALLEL = int(os.environ["SPARSE_PARALLEL"]) if os.getenv("SPARSE_PARALLEL") else None
 TOP_K = 5                     # default number of search results
 SEARCH_MODE = "sparse"        # 'dense', 'sparse', or 'hybrid'
+HYBRID_FUSION = os.getenv("HYBRID_FUSION", "rrf")                       # 'rrf' or 'dbsf'
+HYBRID_PREFETCH_LIMIT = int(os.getenv("HYBRID_PREFETCH_LIMIT", "50"))   # candidates per branch before fusion
+# Payload returned with search hits, passed to Qdrant as `with_payload`: True (all),
+# False (none), {"include": [...]} or {"exclude": [...]}; dotted keys select nested fields.
+PAYLOAD_PROFILES = {
+    "full": True,
+    "none": False,
+    # Exactly the fields the Streamlit result cards render
+    "ui": {"include": [
+        "en.name", "en.price", "en.original_price", "en.discount_percentage", "en.brand", "en.categories",
+        "image", "stats", "text", "title", "brand",
+    ]},
+}
+DEFAULT_PAYLOAD_PROFILE = os.getenv("DEFAULT_PAYLOAD_PROFILE", "full")     # used when a request names none
+# Payload indexes created at startup so filtered searches use filterable HNSW
+PAYLOAD_INDEXES = {
+    "en.categories": "keyword",
+    "en.brand": "keyword",
+    "en.price": "float",
+    "en.discount_percentage": "float",
+    "stats.rating_score": "float",
+}
+SEARCH_BATCH_MAX_QUERIES = int(os.getenv("SEARCH_BATCH_MAX_QUERIES", "256"))  # per POST /search/batch
+POINTS_PAGE_SIZE = int(os.getenv("POINTS_PAGE_SIZE", "1000"))              # default scroll page for GET /points
+POINTS_MAX_PAGE_SIZE = int(os.getenv("POINTS_MAX_PAGE_SIZE", "10000"))
+
+# ── Warm-up / Readiness ────────────────────────────────
+WARMUP_ENABLED = os.getenv("WARMUP_ENABLED", "True").lower() in ("true", "1", "yes")
+WARMUP_RETRY_SECONDS = float(os.getenv("WARMUP_RETRY_SECONDS", "5"))   # wait between failed warm-up attempts
+# Representative query shapes: short keyword, typical query, long description-like query
+WARMUP_QUERIES = [
+    "gloves",
+    "warm winter gloves for men",
+    "lightweight breathable running shoes with cushioned sole for long distance road running "
+    "and daily training, suitable for wide feet, available in black and white",
+]
+
+# ── Projection (GET /projection) ──────────────────────
+PROJECTION_METHOD = os.getenv("PROJECTION_METHOD", "pca")                  # 'pca', 'random' or 'umap'
+PROJECTION_MAX_POINTS = int(os.getenv("PROJECTION_MAX_POINTS", "5000"))    # larger collections are sampled
+PROJECTION_STRATIFY_FIELD = os.getenv("PROJECTION_STRATIFY_FIELD", "en.categories")  # sample per value ("" = uniform)
+PROJECTION_PAYLOAD_FIELDS = ["text", "en.name", "en.brand", "en.categories"]  # returned with each point
+PROJECTION_SCAN_MAX = int(os.getenv("PROJECTION_SCAN_MAX", "200000"))    # stratify over a random sample this big
+PROJECTION_CACHE_TTL = float(os.getenv("PROJECTION_CACHE_TTL", "600"))     # seconds; overwrites keep the point count
 
 # ── FastAPI ────────────────────────────────────────────
 API_HOST = "0.0.0.0"
 API_PORT = 8000
+
+
+def __getattr__(name: str):
+    """Lazily resolve torch-backed settings on first access."""
+    if name == "DEVICE":
+        import torch
+        value = "cuda" if torch.cuda.is_available() else "cpu"
+    elif name == "TORCH_DTYPE":
+        import torch
+        value = torch.float16   # fp16 for 8 GB VRAM optimisation
+    else:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    globals()[name] = value
+    return value
@@ -1,148 +1,606 @@
 """
 database_manager.py — Qdrant CRUD wrapper.
 
-Handles collection creation, batch upsert, search (dense/sparse), and full-scroll retrieval.
+Handles collection creation, batch upsert, search (dense/sparse/hybrid), and full-scroll retrieval.
+Searches, single adds and counts also have *_async variants on AsyncQdrantClient
+for the async API path.
 """
 
+import threading
 import uuid
-from typing import Any
+from typing import Any, Iterator, NamedTuple
 
 import numpy as np
-from qdrant_client import QdrantClient
+from qdrant_client import AsyncQdrantClient, QdrantClient
 from qdrant_client.models import (
+    BinaryQuantization,
+    BinaryQuantizationConfig,
+    CollectionParamsDiff,
+    Disabled,
     Distance,
+    FieldCondition,
+    Filter,
+    Fusion,
+    FusionQuery,
+    HnswConfigDiff,
+    MatchAny,
+    MatchValue,
+    Modifier,
     PointStruct,
+    PayloadSelectorExclude,
+    PayloadSchemaType,
+    PayloadSelectorInclude,
+    Prefetch,
+    QuantizationSearchParams,
+    QueryRequest,
+    Range,
+    Sample,
+    SampleQuery,
+    ScalarQuantization,
+    ScalarQuantizationConfig,
+    ScalarType,
+    SearchParams,
     VectorParams,
+    VectorParamsDiff,
+    SparseIndexParams,
     SparseVector,
+    SparseVectorParams,
 )
 
 import config
+import metrics
 
 _client: QdrantClient | None = None
+_client_lock = threading.Lock()
+_async_client: AsyncQdrantClient | None = None
 
 
 def get_client() -> QdrantClient:
-    """Return a singleton QdrantClient."""
+    """Return a singleton QdrantClient (created once, even under concurrent first calls)."""
     global _client
     if _client is None:
-        _client = QdrantClient(host=config.QDRANT_HOST, port=config.QDRANT_PORT)
-        print(f"[db] Connected to Qdrant at {config.QDRANT_HOST}:{config.QDRANT_PORT}")
+        with _client_lock:
+            if _client is None:
+                with metrics.timed_load("qdrant_client"):
+                    _client = build_client()
+                if config.QDRANT_PREFER_GRPC:
+                    print(f"[db] Connected to Qdrant at {config.QDRANT_HOST}:{config.QDRANT_GRPC_PORT} (gRPC)")
+                else:
+                    print(f"[db] Connected to Qdrant at {config.QDRANT_HOST}:{config.QDRANT_PORT}")
     return _client
 
 
+def get_async_client() -> AsyncQdrantClient:
+    """Return a singleton AsyncQdrantClient for the async request path (event-loop only)."""
+    global _async_client
+    if _async_client is None:
+        with metrics.timed_load("qdrant_async_client"):
+            _async_client = AsyncQdrantClient(**_client_kwargs(None))
+    return _async_client
+
+
+async def close_async_client() -> None:
+    global _async_client
+    if _async_client is not None:
+        await _async_client.close()
+        _async_client = None
+
+
+def build_client(prefer_grpc: bool | None = None) -> QdrantClient:
+    """New QdrantClient over REST or gRPC (default: config.QDRANT_PREFER_GRPC)."""
+    return QdrantClient(**_client_kwargs(prefer_grpc))
+
+
+def _client_kwargs(prefer_grpc: bool | None) -> dict[str, Any]:
+    grpc = config.QDRANT_PREFER_GRPC if prefer_grpc is None else prefer_grpc
+    max_message = config.QDRANT_GRPC_MAX_MESSAGE_MB * 1024 * 1024
+    return {
+        "host": config.QDRANT_HOST,
+        "port": config.QDRANT_PORT,
+        "grpc_port": config.QDRANT_GRPC_PORT,
+        "prefer_grpc": grpc,
+        "timeout": config.QDRANT_TIMEOUT,
+        "grpc_options": {
+            "grpc.max_send_message_length": max_message,
+            "grpc.max_receive_message_length": max_message,
+            "grpc.keepalive_time_ms": config.QDRANT_GRPC_KEEPALIVE_MS,
+        },
+    }
+
+
+# ── Collection profiles ─────────────────────────────────
+# config.COLLECTION_PROFILES decides how the collection is stored; ensure_collection
+# creates it that way, migrate_collection() converts an existing one in place.
+def get_profile(name: str | None = None) -> dict:
+    name = name or config.COLLECTION_PROFILE
+    if name not in config.COLLECTION_PROFILES:
+        raise ValueError(f"Unknown collection profile '{name}' (expected one of {list(config.COLLECTION_PROFILES)})")
+    return config.COLLECTION_PROFILES[name]
+
+
+def _quantization(profile: dict) -> ScalarQuantization | BinaryQuantization | None:
+    if profile["quantization"] == "int8":
+        return ScalarQuantization(scalar=ScalarQuantizationConfig(type=ScalarType.INT8, quantile=0.99, always_ram=True))
+    if profile["quantization"] == "binary":
+        return BinaryQuantization(binary=BinaryQuantizationConfig(always_ram=True))
+    return None
+
+
+def _hnsw(profile: dict) -> HnswConfigDiff:
+    return HnswConfigDiff(m=profile["hnsw_m"], ef_construct=profile["hnsw_ef_construct"], on_disk=profile["hnsw_on_disk"])
+
+
+def _sparse_params(profile: dict) -> SparseVectorParams:
+    # Qdrant/bm25 emits term frequencies only; the IDF half of BM25 is computed server-side.
+    # BGE-M3 lexical weights are already final, so they get no modifier.
+    modifier = None if config.ENCODER_MODE == "bge-m3" else Modifier.IDF
+    return SparseVectorParams(index=SparseIndexParams(on_disk=profile["on_disk"]), modifier=modifier)
+
+
+def collection_config(profile_name: str | None = None) -> dict[str, Any]:
+    """create_collection() arguments for a profile (default: config.COLLECTION_PROFILE)."""
+    profile = get_profile(profile_name)
+    return {
+        "vectors_config": {
+            "text": VectorParams(
+                size=config.EMBEDDING_DIM,
+                distance=Distance.COSINE,
+                on_disk=profile["on_disk"],
+                hnsw_config=_hnsw(profile),
+                quantization_config=_quantization(profile),
+            )
+        },
+        "sparse_vectors_config": {config.SPARSE_VECTOR_NAME: _sparse_params(profile)},
+        "on_disk_payload": profile["on_disk_payload"],
+    }
+
+
+def _dense_search_params() -> SearchParams:
+    """hnsw_ef, plus rescoring / oversampling when the profile searches quantized vectors."""
+    profile = get_profile()
+    quantization = None
+    if profile["quantization"]:
+        quantization = QuantizationSearchParams(rescore=profile["rescore"], oversampling=profile["oversampling"])
+    return SearchParams(hnsw_ef=profile["hnsw_ef"], quantization=quantization)
+
+
+def migrate_collection(profile_name: str) -> None:
+    """
+    Switch an existing collection to another profile in place via update_collection.
+    Qdrant rebuilds quantized copies / moves segments in the background; poll
+    get_client().get_collection() until its status is green again.
+    """
+    profile = get_profile(profile_name)
+    get_client().update_collection(
+        collection_name=config.COLLECTION_NAME,
+        vectors_config={
+            "text": VectorParamsDiff(
+                on_disk=profile["on_disk"],
+                hnsw_config=_hnsw(profile),
+                quantization_config=_quantization(profile) or Disabled.DISABLED,
+            )
+        },
+        sparse_vectors_config={config.SPARSE_VECTOR_NAME: _sparse_params(profile)},
+        collection_params=CollectionParamsDiff(on_disk_payload=profile["on_disk_payload"]),
+    )
+    print(f"[db] Collection '{config.COLLECTION_NAME}' migrating to profile '{profile_name}'")
+
+
 def ensure_collection() -> None:
-    """Create the collection if it doesn't already exist."""
+    """Create the collection (with config.COLLECTION_PROFILE) if it doesn't already exist."""
     client = get_client()
     collections = [c.name for c in client.get_collections().collections]
     if config.COLLECTION_NAME not in collections:
-        # Note: In a real sparse/dense setup, you'd configure both sparse_vectors and named vectors here.
-        # Since we are restoring from snapshot, we assume it's already configured correctly.
-        client.create_collection(
-            collection_name=config.COLLECTION_NAME,
-            vectors_config={"text": VectorParams(size=config.EMBEDDING_DIM, distance=Distance.COSINE)},
-            # If we were creating from scratch, we'd add sparse_vectors_config here too
-        )
-        print(f"[db] Created collection '{config.COLLECTION_NAME}'")
+        # Restored snapshots already carry their layout (see migrate_collection.py to
+        # change it); from scratch we configure the dense 'text' vector and the sparse
+        # vector for the active ENCODER_MODE, stored as the profile says.
+        client.create_collection(collection_name=config.COLLECTION_NAME, **collection_config())
+        print(f"[db] Created collection '{config.COLLECTION_NAME}' (profile '{config.COLLECTION_PROFILE}')")
     else:
         print(f"[db] Collection '{config.COLLECTION_NAME}' already exists.")
+        sparse = client.get_collection(config.COLLECTION_NAME).config.params.sparse_vectors or {}
+        if config.SPARSE_VECTOR_NAME not in sparse:
+            raise RuntimeError(
+                f"Collection '{config.COLLECTION_NAME}' has no sparse vector '{config.SPARSE_VECTOR_NAME}' "
+                f"(has: {', '.join(sparse) or 'none'}), which ENCODER_MODE='{config.ENCODER_MODE}' upserts and "
+                f"searches. Use a collection built in this mode, or switch ENCODER_MODE back."
+            )
+    ensure_payload_indexes()
+
+
+def ensure_payload_indexes() -> None:
+    """Create the config.PAYLOAD_INDEXES the collection is missing (restored snapshots included)."""
+    client = get_client()
+    existing = client.get_collection(config.COLLECTION_NAME).payload_schema or {}
+    for field, schema in config.PAYLOAD_INDEXES.items():
+        if field in existing:
+            continue
+        # Don't block startup (and /health) while Qdrant indexes a large collection;
+        # filtered searches work meanwhile, just without the index
+        client.create_payload_index(
+            collection_name=config.COLLECTION_NAME,
+            field_name=field,
+            field_schema=PayloadSchemaType(schema),
+            wait=False,
+        )
+        print(f"[db] Requested {schema} payload index on '{field}' (built in the background)")
 
 
 def upsert_batch(
-    vectors: np.ndarray,
+    dense_vectors: np.ndarray,
+    sparse_vectors: list[SparseVector],
     payloads: list[dict[str, Any]],
     ids: list[str] | None = None,
-) -> None:
-    """Legacy upsert (only dense). Used by some scripts."""
-    # This function assumes single unnamed vector or just dense 'text' vector
-    # Ideally should be updated to support dense+sparse
-    # For now, we leave it for compatibility but add_single handles both.
-    pass
-
+    batch_size: int | None = None,
+    parallel: int | None = None,
+    wait: bool = False,
+) -> list[str]:
+    """
+    Bulk upsert of points carrying both the dense 'text' and the sparse vector.
 
-def search(query_vector: np.ndarray, top_k: int | None = None) -> list[dict]:
-    """Cosine-similarity search using named vector 'text' (Dense)."""
+    Uses Qdrant's batched uploader: `batch_size` points per request, failed
+    batches retried. `parallel` > 1 uploads from a process pool that
+    qdrant-client starts on every call, so it only pays off for very large
+    batches; the default (UPSERT_PARALLEL) is a single in-process uploader. With wait=False Qdrant acknowledges
+    each batch once it is written to the WAL, without waiting for indexing.
+    Returns the point ids (generated UUIDs when `ids` is None).
+    """
     client = get_client()
-    k = top_k or config.TOP_K
-    results = client.query_points(
+    if ids is None:
+        ids = [str(uuid.uuid4()) for _ in payloads]
+    lengths = {len(ids), len(dense_vectors), len(sparse_vectors), len(payloads)}
+    if len(lengths) != 1:
+        raise ValueError(
+            f"upsert_batch got {len(ids)} ids, {len(dense_vectors)} dense, "
+            f"{len(sparse_vectors)} sparse vectors and {len(payloads)} payloads"
+        )
+
+    points = (
+        PointStruct(
+            id=uid,
+            vector={"text": dense.tolist(), config.SPARSE_VECTOR_NAME: sparse},
+            payload=payload,
+        )
+        for uid, dense, sparse, payload in zip(ids, dense_vectors, sparse_vectors, payloads)
+    )
+    client.upload_points(
         collection_name=config.COLLECTION_NAME,
-        query=query_vector.tolist(),
-        using="text",
-        limit=k,
+        points=points,
+        batch_size=batch_size or config.UPSERT_BATCH_SIZE,
+        parallel=parallel or config.UPSERT_PARALLEL,
+        max_retries=config.UPSERT_MAX_RETRIES,
+        wait=wait,
     )
+    return ids
+
+
+# ── Queries ─────────────────────────────────────────────
+# Each *_query() builds the query_points arguments once; the sync and async
+# search functions below only differ in which client sends them.
+PayloadSelection = bool | PayloadSelectorInclude | PayloadSelectorExclude
+
+
+class BatchQuery(NamedTuple):
+    """One search inside search_batch(); the vector a mode does not use may be None."""
+    mode: str
+    dense: np.ndarray | None
+    sparse: SparseVector | None
+    top_k: int | None = None
+    with_payload: PayloadSelection | None = None
+    query_filter: Filter | None = None
+
+
+def payload_selector(
+    profile: str | None = None,
+    include: list[str] | None = None,
+    exclude: list[str] | None = None,
+) -> PayloadSelection:
+    """
+    Resolve what payload Qdrant should return with each hit: an explicit
+    include list wins over an exclude list, which wins over a named profile
+    from config.PAYLOAD_PROFILES (default DEFAULT_PAYLOAD_PROFILE).
+    """
+    if include:
+        return PayloadSelectorInclude(include=include)
+    if exclude:
+        return PayloadSelectorExclude(exclude=exclude)
+    name = profile or config.DEFAULT_PAYLOAD_PROFILE
+    if name not in config.PAYLOAD_PROFILES:
+        raise ValueError(f"Unknown payload profile '{name}' (expected one of {list(config.PAYLOAD_PROFILES)})")
+    spec = config.PAYLOAD_PROFILES[name]
+    if isinstance(spec, bool):
+        return spec
+    return payload_selector(include=spec.get("include"), exclude=spec.get("exclude"))
+
+
+def _condition(cond: dict) -> FieldCondition:
+    ops = [op for op in ("match", "any", "range") if cond.get(op) is not None]
+    if len(ops) != 1:
+        raise ValueError(f"Filter condition on '{cond.get('key')}' needs exactly one of match / any / range")
+    key = cond["key"]
+    if ops[0] == "match":
+        return FieldCondition(key=key, match=MatchValue(value=cond["match"]))
+    if ops[0] == "any":
+        return FieldCondition(key=key, match=MatchAny(any=cond["any"]))
+    return FieldCondition(key=key, range=Range(**cond["range"]))
+
+
+def build_filter(spec: dict | None) -> Filter | None:
+    """
+    Structured filter → Qdrant Filter. `spec` has optional 'must', 'should' and
+    'must_not' lists of conditions, each {'key': dotted payload key} plus one of
+    'match' (exact value), 'any' (list of values) or 'range' ({gt, gte, lt, lte}).
+    """
+    if not spec:
+        return None
+    clauses = {
+        clause: [_condition(c) for c in spec[clause]]
+        for clause in ("must", "should", "must_not")
+        if spec.get(clause)
+    }
+    return Filter(**clauses) if clauses else None
+
+
+def _hits(results) -> list[dict]:
     return [
         {"id": str(hit.id), "score": hit.score, "payload": hit.payload}
         for hit in results.points
     ]
 
 
-def search_sparse(query_sparse: SparseVector, top_k: int | None = None) -> list[dict]:
-    """Keyword search using named sparse vector 'bm25'."""
-    client = get_client()
+def _dense_query(
+    query_vector: np.ndarray,
+    top_k: int | None,
+    with_payload: PayloadSelection | None = None,
+    query_filter: Filter | None = None,
+) -> dict[str, Any]:
+    return {
+        "collection_name": config.COLLECTION_NAME,
+        "query": query_vector.tolist(),
+        "using": "text",
+        "query_filter": query_filter,
+        "search_params": _dense_search_params(),
+        "limit": top_k or config.TOP_K,
+        "with_payload": payload_selector() if with_payload is None else with_payload,
+    }
+
+
+def _sparse_query(
+    query_sparse: SparseVector,
+    top_k: int | None,
+    with_payload: PayloadSelection | None = None,
+    query_filter: Filter | None = None,
+) -> dict[str, Any]:
+    return {
+        "collection_name": config.COLLECTION_NAME,
+        "query": query_sparse,
+        "using": config.SPARSE_VECTOR_NAME,  # Must match the sparse vector name in collection config
+        "query_filter": query_filter,
+        "limit": top_k or config.TOP_K,
+        "with_payload": payload_selector() if with_payload is None else with_payload,
+    }
+
+
+def _hybrid_query(
+    query_vector: np.ndarray,
+    query_sparse: SparseVector,
+    top_k: int | None,
+    fusion: str | None,
+    with_payload: PayloadSelection | None = None,
+    query_filter: Filter | None = None,
+) -> dict[str, Any]:
     k = top_k or config.TOP_K
-    
-    results = client.query_points(
-        collection_name=config.COLLECTION_NAME,
-        query=query_sparse,
-        using="bm25",  # Must match the sparse vector name in collection config
-        limit=k,
-    )
-    return [
-        {"id": str(hit.id), "score": hit.score, "payload": hit.payload}
-        for hit in results.points
-    ]
+    prefetch_limit = max(k, config.HYBRID_PREFETCH_LIMIT)
+    # The filter goes on each branch, so both candidate lists are already filtered before fusion
+    return {
+        "collection_name": config.COLLECTION_NAME,
+        "prefetch": [
+            Prefetch(
+                query=query_vector.tolist(), using="text", filter=query_filter,
+                params=_dense_search_params(), limit=prefetch_limit,
+            ),
+            Prefetch(query=query_sparse, using=config.SPARSE_VECTOR_NAME, filter=query_filter, limit=prefetch_limit),
+        ],
+        "query": FusionQuery(fusion=Fusion(fusion or config.HYBRID_FUSION)),
+        "limit": k,
+        "with_payload": payload_selector() if with_payload is None else with_payload,
+    }
 
 
-def get_all_points(limit: int = 500) -> list[dict]:
-    """Scroll through collection."""
-    client = get_client()
-    all_points: list[dict] = []
-    offset = None
+def _batch_requests(queries: list[BatchQuery]) -> list[QueryRequest]:
+    requests = []
+    for q in map(BatchQuery._make, queries):
+        if q.mode == "hybrid":
+            kwargs = _hybrid_query(q.dense, q.sparse, q.top_k, None, q.with_payload, q.query_filter)
+        elif q.mode == "sparse":
+            kwargs = _sparse_query(q.sparse, q.top_k, q.with_payload, q.query_filter)
+        else:
+            kwargs = _dense_query(q.dense, q.top_k, q.with_payload, q.query_filter)
+        del kwargs["collection_name"]
+        # QueryRequest's names for them
+        kwargs["filter"] = kwargs.pop("query_filter", None)
+        kwargs["params"] = kwargs.pop("search_params", None)
+        requests.append(QueryRequest(**kwargs))
+    return requests
+
+
+def search(
+    query_vector: np.ndarray,
+    top_k: int | None = None,
+    with_payload: PayloadSelection | None = None,
+    query_filter: Filter | None = None,
+) -> list[dict]:
+    """Cosine-similarity search using named vector 'text' (Dense)."""
+    return _hits(get_client().query_points(**_dense_query(query_vector, top_k, with_payload, query_filter)))
+
+
+def search_sparse(
+    query_sparse: SparseVector,
+    top_k: int | None = None,
+    with_payload: PayloadSelection | None = None,
+    query_filter: Filter | None = None,
+) -> list[dict]:
+    """Keyword search using the named sparse vector (config.SPARSE_VECTOR_NAME, 'bm25' by default)."""
+    return _hits(get_client().query_points(**_sparse_query(query_sparse, top_k, with_payload, query_filter)))
+
+
+def search_hybrid(
+    query_vector: np.ndarray,
+    query_sparse: SparseVector,
+    top_k: int | None = None,
+    fusion: str | None = None,
+    with_payload: PayloadSelection | None = None,
+    query_filter: Filter | None = None,
+) -> list[dict]:
+    """
+    Hybrid search in one round-trip: prefetch candidates from the dense 'text'
+    and the sparse vector, then fuse them server-side with RRF or DBSF.
+    """
+    query = _hybrid_query(query_vector, query_sparse, top_k, fusion, with_payload, query_filter)
+    return _hits(get_client().query_points(**query))
+
+
+def search_batch(queries: list[BatchQuery]) -> list[list[dict]]:
+    """
+    Run many searches in one query_batch_points round-trip. Modes may be
+    mixed (see BatchQuery; plain tuples in the same order work too).
+    Results come back in input order.
+    """
+    responses = get_client().query_batch_points(config.COLLECTION_NAME, _batch_requests(queries))
+    return [_hits(r) for r in responses]
+
+
+async def search_batch_async(queries: list[BatchQuery]) -> list[list[dict]]:
+    responses = await get_async_client().query_batch_points(config.COLLECTION_NAME, _batch_requests(queries))
+    return [_hits(r) for r in responses]
+
+
+async def search_async(
+    query_vector: np.ndarray,
+    top_k: int | None = None,
+    with_payload: PayloadSelection | None = None,
+    query_filter: Filter | None = None,
+) -> list[dict]:
+    query = _dense_query(query_vector, top_k, with_payload, query_filter)
+    return _hits(await get_async_client().query_points(**query))
+
+
+async def search_sparse_async(
+    query_sparse: SparseVector,
+    top_k: int | None = None,
+    with_payload: PayloadSelection | None = None,
+    query_filter: Filter | None = None,
+) -> list[dict]:
+    query = _sparse_query(query_sparse, top_k, with_payload, query_filter)
+    return _hits(await get_async_client().query_points(**query))
+
+
+async def search_hybrid_async(
+    query_vector: np.ndarray,
+    query_sparse: SparseVector,
+    top_k: int | None = None,
+    fusion: str | None = None,
+    with_payload: PayloadSelection | None = None,
+    query_filter: Filter | None = None,
+) -> list[dict]:
+    query = _hybrid_query(query_vector, query_sparse, top_k, fusion, with_payload, query_filter)
+    return _hits(await get_async_client().query_points(**query))
+
 
+def iter_points(
+    page_size: int | None = None,
+    with_vectors: bool = False,
+    offset: Any = None,
+    limit: int | None = None,
+    with_payload: bool | list[str] = True,
+) -> Iterator[tuple[list[dict], Any]]:
+    """
+    Scroll the collection one page at a time, yielding (points, next_offset).
+    Only one page is held in memory; pass a yielded next_offset back as
+    `offset` to resume. Stops after `limit` points or at the end (next_offset None).
+    `with_payload` may list payload keys (dotted for nested) to fetch only those.
+    """
+    client = get_client()
+    remaining = limit
     while True:
-        scroll_kwargs: dict[str, Any] = {
-            "collection_name": config.COLLECTION_NAME,
-            "limit": min(limit - len(all_points), 100),
-            "with_vectors": ["text"],
-            "with_payload": True,
-        }
-        if offset is not None:
-            scroll_kwargs["offset"] = offset
-
-        records, next_offset = client.scroll(**scroll_kwargs)
-
-        for r in records:
-            vec = r.vector
-            if isinstance(vec, dict):
-                vec = vec.get("text", vec)
-            all_points.append({
-                "id": str(r.id),
-                "vector": vec,
-                "payload": r.payload,
-            })
-
-        if next_offset is None or len(all_points) >= limit:
-            break
+        size = page_size or config.POINTS_PAGE_SIZE
+        if remaining is not None:
+            size = min(size, remaining)
+        records, next_offset = client.scroll(
+            collection_name=config.COLLECTION_NAME,
+            limit=size,
+            offset=offset,
+            with_vectors=["text"] if with_vectors else False,
+            with_payload=with_payload,
+        )
+        page = [_point_dict(r, with_vectors) for r in records]
+        yield page, next_offset
+
+        if remaining is not None:
+            remaining -= len(page)
+        if next_offset is None or (remaining is not None and remaining <= 0):
+            return
         offset = next_offset
 
-    return all_points
 
+def retrieve_points(ids: list, with_vectors: bool = False, with_payload: bool | list[str] = True) -> list[dict]:
+    """Fetch specific points by id (order not guaranteed)."""
+    records = get_client().retrieve(
+        collection_name=config.COLLECTION_NAME,
+        ids=ids,
+        with_vectors=["text"] if with_vectors else False,
+        with_payload=with_payload,
+    )
+    return [_point_dict(r, with_vectors) for r in records]
 
-def add_single(text: str, dense_vector: np.ndarray, sparse_vector: SparseVector) -> str:
-    """Add a single point with both dense and sparse vectors."""
-    client = get_client()
-    uid = str(uuid.uuid4())
-    
-    point = PointStruct(
-        id=uid,
+
+def sample_points(limit: int, with_vectors: bool = False, with_payload: bool | list[str] = True) -> list[dict]:
+    """Up to `limit` points picked uniformly at random by Qdrant (no full scroll)."""
+    response = get_client().query_points(
+        collection_name=config.COLLECTION_NAME,
+        query=SampleQuery(sample=Sample.RANDOM),
+        limit=limit,
+        with_vectors=["text"] if with_vectors else False,
+        with_payload=with_payload,
+    )
+    return [_point_dict(p, with_vectors) for p in response.points]
+
+
+def _point_dict(record, with_vectors: bool) -> dict:
+    point = {"id": str(record.id), "payload": record.payload}
+    if with_vectors:
+        vec = record.vector
+        point["vector"] = vec.get("text", vec) if isinstance(vec, dict) else vec
+    return point
+
+
+def get_all_points(limit: int = 500) -> list[dict]:
+    """Scroll through collection (vectors included) into one list; prefer iter_points for exports."""
+    return [p for page, _ in iter_points(with_vectors=True, limit=limit) for p in page]
+
+
+def _single_point(text: str, dense_vector: np.ndarray, sparse_vector: SparseVector) -> PointStruct:
+    return PointStruct(
+        id=str(uuid.uuid4()),
         vector={
             "text": dense_vector.tolist(),
-            "bm25": sparse_vector
+            config.SPARSE_VECTOR_NAME: sparse_vector
         },
         payload={"text": text}
     )
-    
-    client.upsert(collection_name=config.COLLECTION_NAME, points=[point])
-    return uid
+
+
+def add_single(text: str, dense_vector: np.ndarray, sparse_vector: SparseVector) -> str:
+    """Add a single point with both dense and sparse vectors."""
+    point = _single_point(text, dense_vector, sparse_vector)
+    get_client().upsert(collection_name=config.COLLECTION_NAME, points=[point])
+    return point.id
+
+
+async def add_single_async(text: str, dense_vector: np.ndarray, sparse_vector: SparseVector) -> str:
+    point = _single_point(text, dense_vector, sparse_vector)
+    await get_async_client().upsert(collection_name=config.COLLECTION_NAME, points=[point])
+    return point.id
 
 
 def collection_count() -> int:
@@ -150,3 +608,8 @@ def collection_count() -> int:
     client = get_client()
     info = client.get_collection(config.COLLECTION_NAME)
     return info.points_count
+
+
+async def collection_count_async() -> int:
+    info = await get_async_client().get_collection(config.COLLECTION_NAME)
+    return info.points_count
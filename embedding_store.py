@@ -0,0 +1,225 @@
+"""
+embedding_store.py — Persistent on-disk cache of document embeddings.
+
+Rows are keyed by a hash of (text, dense model, sparse model, dim) and live in
+append-only files inside one directory:
+
+    keys.bin            16-byte BLAKE2b digest per row (row number = position)
+    dense.bin           row-major float16/float32 matrix, memory-mapped for reads
+    sparse_indptr.bin   uint64 end offset of each row's sparse entries (CSR indptr)
+    sparse_indices.bin  uint32 token ids
+    sparse_values.bin   float32 weights
+
+`keys.bin` is written last, so after a crash any partially appended data past
+the last complete key is simply truncated before the next append.
+
+Several processes may share one directory (API workers, ingest.py). Appends
+hold an exclusive flock on `lock`, and a row's number is taken from the size
+of `keys.bin` under that lock; readers pick up rows other processes appended
+by re-reading `keys.bin` past the size they last saw.
+"""
+
+import fcntl
+import hashlib
+import json
+import os
+import threading
+from contextlib import contextmanager
+from typing import Iterator
+
+import numpy as np
+from qdrant_client.models import SparseVector
+
+import config
+
+_KEY_BYTES = 16
+
+_store: "EmbeddingStore | None" = None
+_store_lock = threading.Lock()
+
+
+class EmbeddingStore:
+    """Append-only dense + CSR sparse embedding store backed by memory-mapped files."""
+
+    def __init__(self, path: str, dim: int, dtype: str = "float16", namespace: str = "") -> None:
+        self.path = path
+        self.dim = dim
+        self.namespace = namespace
+        os.makedirs(path, exist_ok=True)
+        self._check_meta(dtype)
+        self.dtype = np.dtype(dtype)
+        self._lock = threading.Lock()
+
+        self._files = {
+            name: os.path.join(path, f"{name}.bin")
+            for name in ("keys", "dense", "sparse_indptr", "sparse_indices", "sparse_values")
+        }
+        self._lock_file = open(os.path.join(path, "lock"), "a")
+        with self._exclusive():
+            self._recover()
+
+        self._index: dict[bytes, int] = {}
+        self._rows = 0      # rows of keys.bin already in self._index
+        self._refresh()
+        self._writers = {name: open(p, "ab") for name, p in self._files.items()}
+        self._maps: dict[str, np.memmap] = {}
+        self._mapped_rows = -1
+
+    # ── Layout ──────────────────────────────────────────
+    def _check_meta(self, dtype: str) -> None:
+        meta_path = os.path.join(self.path, "meta.json")
+        meta = {"dim": self.dim, "dtype": dtype, "version": 1}
+        if os.path.exists(meta_path):
+            with open(meta_path) as f:
+                existing = json.load(f)
+            if existing["dim"] != self.dim or existing["dtype"] != dtype:
+                raise ValueError(
+                    f"Embedding store at {self.path} holds dim={existing['dim']} {existing['dtype']}, "
+                    f"not dim={self.dim} {dtype}. Point EMBEDDING_STORE_DIR elsewhere or delete it."
+                )
+        else:
+            with open(meta_path, "w") as f:
+                json.dump(meta, f)
+
+    @contextmanager
+    def _exclusive(self) -> Iterator[None]:
+        """Cross-process write lock: flock on the `lock` file."""
+        fcntl.flock(self._lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(self._lock_file, fcntl.LOCK_UN)
+
+    def _refresh(self) -> None:
+        """Index keys appended (by any process) since the last refresh."""
+        rows = os.path.getsize(self._files["keys"]) // _KEY_BYTES
+        if rows <= self._rows:
+            return
+        with open(self._files["keys"], "rb") as f:
+            f.seek(self._rows * _KEY_BYTES)
+            raw = f.read((rows - self._rows) * _KEY_BYTES)
+        for i in range(0, len(raw) // _KEY_BYTES * _KEY_BYTES, _KEY_BYTES):
+            self._index.setdefault(raw[i:i + _KEY_BYTES], self._rows + i // _KEY_BYTES)
+        self._rows += len(raw) // _KEY_BYTES
+
+    def _recover(self) -> None:
+        """Truncate every file to the last row whose key was fully written (caller holds the flock)."""
+        for p in self._files.values():
+            open(p, "ab").close()
+        rows = os.path.getsize(self._files["keys"]) // _KEY_BYTES
+        os.truncate(self._files["keys"], rows * _KEY_BYTES)
+        os.truncate(self._files["dense"], rows * self.dim * self.dtype.itemsize)
+        os.truncate(self._files["sparse_indptr"], rows * 8)
+        nnz = 0
+        if rows:
+            nnz = int(np.fromfile(self._files["sparse_indptr"], dtype=np.uint64, count=1, offset=(rows - 1) * 8)[0])
+        os.truncate(self._files["sparse_indices"], nnz * 4)
+        os.truncate(self._files["sparse_values"], nnz * 4)
+
+    def _remap(self) -> None:
+        rows = self._rows
+        if rows == self._mapped_rows:
+            return
+        self._maps = {}
+        if rows:
+            self._maps["dense"] = np.memmap(self._files["dense"], dtype=self.dtype, mode="r", shape=(rows, self.dim))
+            self._maps["indptr"] = np.memmap(self._files["sparse_indptr"], dtype=np.uint64, mode="r", shape=(rows,))
+            # Sized from the indexed rows, not the files: another process may be mid-append
+            nnz = int(self._maps["indptr"][rows - 1])
+            if nnz:
+                self._maps["indices"] = np.memmap(self._files["sparse_indices"], dtype=np.uint32, mode="r", shape=(nnz,))
+                self._maps["values"] = np.memmap(self._files["sparse_values"], dtype=np.float32, mode="r", shape=(nnz,))
+        self._mapped_rows = rows
+
+    # ── Public API ──────────────────────────────────────
+    def key(self, text: str) -> bytes:
+        h = hashlib.blake2b(digest_size=_KEY_BYTES)
+        h.update(f"{self.namespace}\0{self.dim}\0".encode())
+        h.update(text.encode("utf-8"))
+        return h.digest()
+
+    def __len__(self) -> int:
+        return self._rows
+
+    def get_many(self, texts: list[str]) -> list[tuple[np.ndarray, SparseVector] | None]:
+        """Return (dense float32 row, SparseVector) per text, or None where not stored."""
+        with self._lock:
+            self._refresh()
+            self._remap()
+            out: list[tuple[np.ndarray, SparseVector] | None] = []
+            for text in texts:
+                row = self._index.get(self.key(text))
+                if row is None:
+                    out.append(None)
+                    continue
+                dense = np.asarray(self._maps["dense"][row], dtype=np.float32)
+                start = int(self._maps["indptr"][row - 1]) if row else 0
+                end = int(self._maps["indptr"][row])
+                if end > start:
+                    sparse = SparseVector(
+                        indices=self._maps["indices"][start:end].tolist(),
+                        values=self._maps["values"][start:end].tolist(),
+                    )
+                else:
+                    sparse = SparseVector(indices=[], values=[])
+                out.append((dense, sparse))
+            return out
+
+    def put_many(self, texts: list[str], dense: np.ndarray, sparse: list[SparseVector]) -> None:
+        """Append embeddings for texts that are not stored yet."""
+        with self._lock, self._exclusive():
+            # Under the flock nobody else is mid-append: drop any torn tail a crashed
+            # writer left, then catch up on rows other processes added
+            self._recover()
+            self._refresh()
+            nnz = os.path.getsize(self._files["sparse_indices"]) // 4
+            keys, dense_rows, indptr, indices, values = [], [], [], [], []
+            seen: set[bytes] = set()
+            for text, d, s in zip(texts, dense, sparse):
+                k = self.key(text)
+                if k in self._index or k in seen:
+                    continue
+                seen.add(k)
+                keys.append(k)
+                dense_rows.append(d)
+                indices.extend(s.indices)
+                values.extend(s.values)
+                nnz += len(s.indices)
+                indptr.append(nnz)
+            if not keys:
+                return
+
+            w = self._writers
+            w["dense"].write(np.asarray(dense_rows, dtype=self.dtype).tobytes())
+            w["sparse_indices"].write(np.asarray(indices, dtype=np.uint32).tobytes())
+            w["sparse_values"].write(np.asarray(values, dtype=np.float32).tobytes())
+            w["sparse_indptr"].write(np.asarray(indptr, dtype=np.uint64).tobytes())
+            for f in ("dense", "sparse_indices", "sparse_values", "sparse_indptr"):
+                w[f].flush()
+            w["keys"].write(b"".join(keys))
+            w["keys"].flush()
+            self._refresh()
+
+    def close(self) -> None:
+        with self._lock:
+            self._maps = {}
+            for w in self._writers.values():
+                w.close()
+            self._lock_file.close()
+
+
+def get_store() -> EmbeddingStore | None:
+    """Return the singleton store, or None when EMBEDDING_STORE_DIR is unset."""
+    global _store
+    if not config.EMBEDDING_STORE_DIR:
+        return None
+    with _store_lock:
+        if _store is None:
+            _store = EmbeddingStore(
+                config.EMBEDDING_STORE_DIR,
+                dim=config.EMBEDDING_DIM,
+                dtype=config.EMBEDDING_STORE_DTYPE,
+                namespace=f"{config.MODEL_NAME}|{config.SPARSE_ENCODER_ID}",
+            )
+            print(f"[embedding_store] Opened {config.EMBEDDING_STORE_DIR} ({len(_store)} cached documents)")
+    return _store
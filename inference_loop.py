@@ -0,0 +1,107 @@
+"""
+inference_loop.py — Continuous dynamic-batching loop for the local dense model.
+
+Every dense encode on the local path becomes a queue entry. A single
+background thread pulls entries highest-priority first (interactive queries
+ahead of bulk ingestion), packs them into a batch up to a padded-token budget
+and runs batches back-to-back, so the model stays saturated under mixed load
+while a query never waits behind more than one in-flight batch.
+"""
+
+import itertools
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from typing import Callable
+
+import numpy as np
+
+import metrics
+
+INTERACTIVE = 0
+BULK = 1
+PRIORITIES = {"interactive": INTERACTIVE, "bulk": BULK}
+
+
+@dataclass(order=True)
+class _Item:
+    priority: int
+    seq: int
+    tokens: int = field(compare=False)
+    text: str = field(compare=False)
+    future: Future = field(compare=False)
+
+
+def estimate_tokens(text: str, max_tokens: int) -> int:
+    """Cheap token estimate (~4 chars per token + specials) used only for scheduling."""
+    return min(len(text) // 4 + 2, max_tokens)
+
+
+class InferenceLoop:
+    """Priority queue + batching thread in front of a batch encode function."""
+
+    def __init__(
+        self,
+        encode_fn: Callable[[list[str]], np.ndarray],
+        token_budget: int,
+        max_batch: int,
+        max_tokens: int,
+        name: str = "inference-loop",
+    ) -> None:
+        self._encode_fn = encode_fn
+        self._token_budget = token_budget
+        self._max_batch = max_batch
+        self._max_tokens = max_tokens
+        self._queue: queue.PriorityQueue[_Item] = queue.PriorityQueue()
+        self._seq = itertools.count()
+        self._name = name
+        metrics.register_gauge(f"{name}.queue_depth", self._queue.qsize)
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self._thread.start()
+
+    def submit(self, texts: list[str], priority: str = "bulk") -> list[Future]:
+        """Queue texts; each Future resolves to that text's embedding row."""
+        prio = PRIORITIES[priority]
+        futures = []
+        for text in texts:
+            future: Future = Future()
+            self._queue.put(_Item(prio, next(self._seq), estimate_tokens(text, self._max_tokens), text, future))
+            futures.append(future)
+        return futures
+
+    def encode(self, texts: list[str], priority: str = "bulk") -> np.ndarray:
+        futures = self.submit(texts, priority)
+        return np.stack([f.result() for f in futures])
+
+    def _next_batch(self) -> list[_Item]:
+        first = self._queue.get()
+        batch, longest = [first], first.tokens
+        while len(batch) < self._max_batch:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if max(longest, item.tokens) * (len(batch) + 1) > self._token_budget:
+                self._queue.put(item)   # keeps its (priority, seq) slot for the next batch
+                break
+            batch.append(item)
+            longest = max(longest, item.tokens)
+        return batch
+
+    def _run(self) -> None:
+        while True:
+            batch = self._next_batch()
+            metrics.observe(f"{self._name}.batch_size", len(batch))
+            metrics.observe(f"{self._name}.batch_tokens", max(i.tokens for i in batch) * len(batch))
+            t0 = time.perf_counter()
+            try:
+                rows = self._encode_fn([item.text for item in batch])
+            except Exception as e:
+                for item in batch:
+                    item.future.set_exception(e)
+                continue
+            metrics.observe(f"{self._name}.batch_ms", (time.perf_counter() - t0) * 1000)
+            for item, row in zip(batch, rows):
+                item.future.set_result(row)
@@ -0,0 +1,391 @@
+"""
+ingest.py — Streaming, resumable bulk ingestion of product catalogs.
+
+Usage
+-----
+python ingest.py products.jsonl
+python ingest.py products.parquet --text-fields en.name en.categories brand --id-field id
+python ingest.py products.csv --batch-size 512 --checkpoint products.ckpt.json
+
+Pipeline
+--------
+    read → dense encode → sparse encode → upsert
+
+Each stage runs in its own thread, connected by bounded queues, so a slow
+stage applies backpressure instead of letting batches pile up in memory.
+After every upserted batch the number of completed records is checkpointed;
+a rerun skips them and resumes where the last run stopped. Point ids are
+derived deterministically, so replaying a partially upserted batch is safe.
+Per-stage docs/sec are reported periodically and at the end.
+
+Each pipeline batch is uploaded in UPSERT_BATCH_SIZE requests by a single
+in-process uploader (--upsert-parallel, default UPSERT_PARALLEL = 1). The
+upsert stage already overlaps with encoding, and qdrant-client's parallel>1
+starts a fresh process pool on every upload call, which costs more than it
+saves at pipeline batch sizes.
+Raise it only for large --batch-size values against a remote cluster.
+"""
+
+import argparse
+import csv
+import json
+import os
+import queue
+import sys
+import threading
+import time
+import uuid
+from dataclasses import dataclass, field
+from typing import Any, Iterator
+
+import numpy as np
+from qdrant_client.models import SparseVector
+
+import config
+import database_manager
+import embedding_store
+import model_loader
+
+DEFAULT_TEXT_FIELDS = ["en.name", "en.categories", "en.brand", "brand"]
+STAGES = ("read", "dense", "sparse", "upsert")
+_END = None     # end-of-stream marker passed down the queues
+
+
+@dataclass
+class Batch:
+    end: int                        # source records consumed up to here (incl. skipped ones)
+    records: list[dict]
+    texts: list[str]
+    ids: list[str]
+    dense: np.ndarray | None = None
+    sparse: list[SparseVector | None] = field(default_factory=list)
+    missing: list[int] = field(default_factory=list)    # rows not found in the embedding store
+
+
+@dataclass
+class StageStats:
+    docs: int = 0
+    busy: float = 0.0
+
+
+# ── Readers ─────────────────────────────────────────────
+def _detect_format(path: str) -> str:
+    ext = os.path.splitext(path)[1].lower()
+    return {".jsonl": "jsonl", ".ndjson": "jsonl", ".json": "jsonl", ".csv": "csv", ".parquet": "parquet"}.get(ext, "jsonl")
+
+
+def _unflatten(row: dict[str, Any]) -> dict[str, Any]:
+    """CSV columns like 'en.name' → {'en': {'name': ...}}; JSON-looking cells are decoded."""
+    out: dict[str, Any] = {}
+    for key, value in row.items():
+        if isinstance(value, str) and value[:1] in ("[", "{"):
+            try:
+                value = json.loads(value)
+            except ValueError:
+                pass
+        node = out
+        *parents, leaf = key.split(".")
+        for p in parents:
+            node = node.setdefault(p, {})
+        node[leaf] = value
+    return out
+
+
+def read_records(path: str, fmt: str, skip: int = 0) -> Iterator[dict]:
+    """Stream records from JSONL / CSV / Parquet, skipping the first `skip`."""
+    if fmt == "jsonl":
+        with open(path, encoding="utf-8") as f:
+            seen = 0
+            for line in f:
+                if not line.strip():
+                    continue
+                seen += 1
+                if seen > skip:
+                    yield json.loads(line)
+    elif fmt == "csv":
+        with open(path, encoding="utf-8", newline="") as f:
+            for i, row in enumerate(csv.DictReader(f)):
+                if i >= skip:
+                    yield _unflatten(row)
+    elif fmt == "parquet":
+        try:
+            import pyarrow.parquet as pq
+        except ImportError:
+            sys.exit("[ingest] Parquet input needs 'pyarrow' (pip install pyarrow).")
+        seen = 0
+        for record_batch in pq.ParquetFile(path).iter_batches(batch_size=4096):
+            if seen + record_batch.num_rows <= skip:
+                seen += record_batch.num_rows
+                continue
+            for row in record_batch.to_pylist():
+                seen += 1
+                if seen > skip:
+                    yield row
+    else:
+        raise ValueError(f"Unknown format '{fmt}'")
+
+
+# ── Text & id extraction ────────────────────────────────
+def _lookup(record: dict, path: str) -> Any:
+    if path in record:
+        return record[path]
+    node: Any = record
+    for part in path.split("."):
+        if not isinstance(node, dict) or part not in node:
+            return None
+        node = node[part]
+    return node
+
+
+def _render(value: Any) -> str:
+    if value is None:
+        return ""
+    if isinstance(value, dict):
+        return _render(value.get("name"))
+    if isinstance(value, (list, tuple)):
+        return ", ".join(s for s in (_render(v) for v in value) if s)
+    return str(value).strip()
+
+
+def extract_text(record: dict, fields: list[str]) -> str:
+    """Join the configured fields into the text to embed, dropping empties and repeats."""
+    parts: list[str] = []
+    for f in fields:
+        text = _render(_lookup(record, f))
+        if text and text not in parts:
+            parts.append(text)
+    return ". ".join(parts)
+
+
+def point_id(record: dict, index: int, id_field: str | None, source: str) -> str:
+    """Stable point id: from the id field when present, else from source + record index."""
+    raw = _lookup(record, id_field) if id_field else None
+    if raw is None:
+        return str(uuid.uuid5(uuid.NAMESPACE_URL, f"{source}#{index}"))
+    try:
+        return str(uuid.UUID(str(raw)))
+    except ValueError:
+        return str(uuid.uuid5(uuid.NAMESPACE_URL, str(raw)))
+
+
+# ── Checkpoint ──────────────────────────────────────────
+def load_checkpoint(path: str, source: str) -> int:
+    if not os.path.exists(path):
+        return 0
+    with open(path) as f:
+        ckpt = json.load(f)
+    if ckpt.get("source") != source:
+        sys.exit(f"[ingest] Checkpoint {path} belongs to {ckpt.get('source')}; use --restart or another --checkpoint.")
+    return int(ckpt["records_done"])
+
+
+def save_checkpoint(path: str, source: str, records_done: int) -> None:
+    tmp = f"{path}.tmp"
+    with open(tmp, "w") as f:
+        json.dump({"source": source, "records_done": records_done, "updated_at": time.time()}, f)
+    os.replace(tmp, path)
+
+
+# ── Pipeline ────────────────────────────────────────────
+class Pipeline:
+    def __init__(self, args: argparse.Namespace) -> None:
+        self.args = args
+        self.source = os.path.abspath(args.path)
+        self.checkpoint = args.checkpoint or f"{args.path}.checkpoint.json"
+        self.stats = {name: StageStats() for name in STAGES}
+        self.stop = threading.Event()
+        self.errors: list[BaseException] = []
+        self.skipped = 0
+        self.records_done = 0
+        self.store = embedding_store.get_store()
+        size = args.queue_size
+        self.q_dense: queue.Queue = queue.Queue(size)
+        self.q_sparse: queue.Queue = queue.Queue(size)
+        self.q_upsert: queue.Queue = queue.Queue(size)
+
+    def _put(self, q: queue.Queue, item: Any) -> None:
+        while not self.stop.is_set():
+            try:
+                q.put(item, timeout=0.5)
+                return
+            except queue.Full:
+                continue
+
+    def _get(self, q: queue.Queue) -> Any:
+        while not self.stop.is_set():
+            try:
+                return q.get(timeout=0.5)
+            except queue.Empty:
+                continue
+        return _END
+
+    def _timed(self, stage: str, docs: int, t0: float) -> None:
+        s = self.stats[stage]
+        s.docs += docs
+        s.busy += time.perf_counter() - t0
+
+    def _stage(self, fn, *args) -> None:
+        try:
+            fn(*args)
+        except BaseException as e:
+            self.errors.append(e)
+            self.stop.set()
+
+    # Stage 1: read + batch
+    def read(self, skip: int) -> None:
+        a = self.args
+        fmt = a.format or _detect_format(a.path)
+        records, texts, ids = [], [], []
+        index = skip
+        batch_start = skip
+        t0 = time.perf_counter()
+        for record in read_records(a.path, fmt, skip):
+            text = extract_text(record, a.text_fields)
+            if text:
+                records.append(record)
+                texts.append(text)
+                ids.append(point_id(record, index, a.id_field, self.source))
+            else:
+                self.skipped += 1
+            index += 1
+            if index - batch_start == a.batch_size:
+                self._timed("read", index - batch_start, t0)
+                self._put(self.q_dense, Batch(index, records, texts, ids))
+                records, texts, ids = [], [], []
+                batch_start = index
+                t0 = time.perf_counter()
+            if self.stop.is_set():
+                return
+        if index > batch_start:
+            self._timed("read", index - batch_start, t0)
+            self._put(self.q_dense, Batch(index, records, texts, ids))
+        self._put(self.q_dense, _END)
+
+    # Stage 2: embedding-store lookup + dense encode (BGE-M3 mode: dense + sparse in one pass)
+    def dense(self) -> None:
+        while (batch := self._get(self.q_dense)) is not _END:
+            t0 = time.perf_counter()
+            n = len(batch.texts)
+            batch.dense = np.empty((n, config.EMBEDDING_DIM), dtype=np.float32)
+            batch.sparse = [None] * n
+            cached = self.store.get_many(batch.texts) if self.store else [None] * n
+            for i, hit in enumerate(cached):
+                if hit is None:
+                    batch.missing.append(i)
+                else:
+                    batch.dense[i], batch.sparse[i] = hit
+            miss_texts = [batch.texts[i] for i in batch.missing]
+            if miss_texts:
+                if config.ENCODER_MODE == "bge-m3":
+                    heads = model_loader.encode_bge_m3(miss_texts)
+                    batch.dense[batch.missing] = heads["dense"]
+                    for i, vec in zip(batch.missing, heads["sparse"]):
+                        batch.sparse[i] = vec
+                else:
+                    batch.dense[batch.missing] = model_loader.encode_dense(miss_texts)
+            self._timed("dense", n, t0)
+            self._put(self.q_sparse, batch)
+        self._put(self.q_sparse, _END)
+
+    # Stage 3: sparse encode + persist new embeddings
+    def sparse(self) -> None:
+        while (batch := self._get(self.q_sparse)) is not _END:
+            t0 = time.perf_counter()
+            todo = [i for i in batch.missing if batch.sparse[i] is None]
+            if todo:
+                vectors = model_loader.encode_sparse_batch([batch.texts[i] for i in todo])
+                for i, vec in zip(todo, vectors):
+                    batch.sparse[i] = vec
+            if self.store and batch.missing:
+                self.store.put_many(
+                    [batch.texts[i] for i in batch.missing],
+                    batch.dense[batch.missing],
+                    [batch.sparse[i] for i in batch.missing],
+                )
+            self._timed("sparse", len(batch.texts), t0)
+            self._put(self.q_upsert, batch)
+        self._put(self.q_upsert, _END)
+
+    # Stage 4: upsert + checkpoint
+    def upsert(self) -> None:
+        while (batch := self._get(self.q_upsert)) is not _END:
+            t0 = time.perf_counter()
+            if batch.texts:
+                database_manager.upsert_batch(
+                    batch.dense, batch.sparse, batch.records, batch.ids,
+                    batch_size=self.args.upsert_batch_size, parallel=self.args.upsert_parallel,
+                )
+            self._timed("upsert", len(batch.texts), t0)
+            self.records_done = batch.end
+            save_checkpoint(self.checkpoint, self.source, self.records_done)
+
+    def report(self, started: float, final: bool = False) -> None:
+        wall = time.perf_counter() - started
+        parts = []
+        for name in STAGES:
+            s = self.stats[name]
+            rate = s.docs / s.busy if s.busy else 0.0
+            parts.append(f"{name} {rate:,.0f}/s")
+        done = self.stats["upsert"].docs
+        label = "done" if final else "progress"
+        print(
+            f"[ingest] {label}: {done:,} upserted ({done / wall if wall else 0:,.0f} docs/s overall) | "
+            + " | ".join(parts)
+            + f" | skipped {self.skipped:,}"
+        )
+
+    def run(self) -> None:
+        if self.args.restart and os.path.exists(self.checkpoint):
+            os.remove(self.checkpoint)
+        skip = load_checkpoint(self.checkpoint, self.source)
+        if skip:
+            print(f"[ingest] Resuming {self.args.path} after {skip:,} records (checkpoint {self.checkpoint})")
+        self.records_done = skip
+
+        database_manager.ensure_collection()
+        threads = [
+            threading.Thread(target=self._stage, args=(self.read, skip), name="ingest-read"),
+            threading.Thread(target=self._stage, args=(self.dense,), name="ingest-dense"),
+            threading.Thread(target=self._stage, args=(self.sparse,), name="ingest-sparse"),
+            threading.Thread(target=self._stage, args=(self.upsert,), name="ingest-upsert"),
+        ]
+        started = time.perf_counter()
+        for t in threads:
+            t.start()
+        try:
+            while any(t.is_alive() for t in threads):
+                threads[-1].join(timeout=self.args.report_every)
+                if threads[-1].is_alive():
+                    self.report(started)
+        except KeyboardInterrupt:
+            print("[ingest] Interrupted; stopping after the current batches (checkpoint kept).")
+            self.stop.set()
+            for t in threads:
+                t.join()
+        self.report(started, final=True)
+        if self.errors:
+            raise self.errors[0]
+        print(f"[ingest] {self.records_done:,} records processed; checkpoint at {self.checkpoint}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Stream a product catalog into Qdrant")
+    parser.add_argument("path", help="JSONL / CSV / Parquet file")
+    parser.add_argument("--format", choices=["jsonl", "csv", "parquet"], help="default: from file extension")
+    parser.add_argument("--text-fields", nargs="+", default=DEFAULT_TEXT_FIELDS,
+                        help="dotted payload paths joined into the text to embed")
+    parser.add_argument("--id-field", default="id", help="record field used for stable point ids")
+    parser.add_argument("--batch-size", type=int, default=256, help="records per pipeline batch")
+    parser.add_argument("--upsert-batch-size", type=int, default=config.UPSERT_BATCH_SIZE,
+                        help="points per Qdrant upload request")
+    parser.add_argument("--upsert-parallel", type=int, default=config.UPSERT_PARALLEL,
+                        help="upload processes per pipeline batch (see module docstring)")
+    parser.add_argument("--queue-size", type=int, default=4, help="batches buffered between stages")
+    parser.add_argument("--checkpoint", help="checkpoint file (default: <path>.checkpoint.json)")
+    parser.add_argument("--restart", action="store_true", help="ignore any existing checkpoint")
+    parser.add_argument("--report-every", type=float, default=10.0, help="seconds between progress reports")
+    Pipeline(parser.parse_args()).run()
+
+
+if __name__ == "__main__":
+    main()
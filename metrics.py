@@ -0,0 +1,83 @@
+"""
+metrics.py — Minimal in-process metrics registry.
+
+Tracks how long the heavy singletons (models, clients) took to load, plus
+gauges and fixed-bucket histograms for the inference pipeline. Exposed
+through GET /metrics.
+"""
+
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Iterator
+
+_lock = threading.Lock()
+_loads: dict[str, dict] = {}
+_gauges: dict[str, Callable[[], float]] = {}
+_histograms: dict[str, "Histogram"] = {}
+
+POW2_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256, 512, 1024, 2048, 4096, 8192, 16384, 32768)
+
+
+class Histogram:
+    """Cumulative fixed-bucket histogram (Prometheus-style `le` buckets)."""
+
+    def __init__(self, buckets: tuple[float, ...]) -> None:
+        self.buckets = tuple(sorted(buckets))
+        self.counts = [0] * (len(self.buckets) + 1)   # last slot = +Inf
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def to_dict(self) -> dict:
+        cumulative, running = {}, 0
+        for le, c in zip((*self.buckets, "+Inf"), self.counts):
+            running += c
+            cumulative[str(le)] = running
+        return {"count": self.count, "sum": self.sum, "buckets": cumulative}
+
+
+def register_gauge(name: str, fn: Callable[[], float]) -> None:
+    """Register a gauge whose value is read when metrics are snapshotted."""
+    with _lock:
+        _gauges[name] = fn
+
+
+def observe(name: str, value: float, buckets: tuple[float, ...] = POW2_BUCKETS) -> None:
+    with _lock:
+        hist = _histograms.get(name)
+        if hist is None:
+            hist = _histograms[name] = Histogram(buckets)
+        hist.observe(value)
+
+
+@contextmanager
+def timed_load(name: str) -> Iterator[None]:
+    """Time a singleton load and record it under `name`."""
+    t0 = time.perf_counter()
+    yield
+    seconds = time.perf_counter() - t0
+    with _lock:
+        entry = _loads.setdefault(name, {"count": 0, "seconds": 0.0, "loaded_at": None})
+        entry["count"] += 1
+        entry["seconds"] = seconds
+        entry["loaded_at"] = time.time()
+
+
+def load_count(name: str) -> int:
+    with _lock:
+        return _loads.get(name, {}).get("count", 0)
+
+
+def snapshot() -> dict:
+    with _lock:
+        return {
+            "loads": {name: dict(entry) for name, entry in _loads.items()},
+            "gauges": {name: fn() for name, fn in _gauges.items()},
+            "histograms": {name: hist.to_dict() for name, hist in _histograms.items()},
+        }
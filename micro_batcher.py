@@ -0,0 +1,81 @@
+"""
+micro_batcher.py — Coalesces concurrent single-text encode calls into one batch.
+
+Callers submit one text each; a background thread collects whatever arrives
+within a short window (or until `max_batch` texts are waiting), encodes them
+with a single call and hands each caller back its own row.
+
+With an `executor` (remote / out-of-process encoders) each batch is sent from
+the executor and the thread goes straight back to collecting, so several
+batches can be in flight; without one (in-process model) it encodes inline.
+"""
+
+import queue
+import threading
+import time
+from concurrent.futures import Executor, Future
+from typing import Callable
+
+import numpy as np
+
+
+class MicroBatcher:
+    """Request-coalescing front for a batch encode function."""
+
+    def __init__(
+        self,
+        encode_fn: Callable[[list[str]], np.ndarray],
+        window_ms: float,
+        max_batch: int,
+        name: str = "micro-batcher",
+        executor: Executor | None = None,
+    ) -> None:
+        self._encode_fn = encode_fn
+        self._executor = executor
+        self._window = window_ms / 1000.0
+        self._max_batch = max_batch
+        self._queue: queue.Queue[tuple[str, Future]] = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self._thread.start()
+
+    def submit(self, text: str) -> Future:
+        """Queue one text; the returned Future resolves to its embedding row."""
+        future: Future = Future()
+        self._queue.put((text, future))
+        return future
+
+    def encode(self, texts: list[str]) -> np.ndarray:
+        """Blocking helper: submit every text and stack the rows in input order."""
+        futures = [self.submit(t) for t in texts]
+        return np.stack([f.result() for f in futures])
+
+    def _collect(self) -> list[tuple[str, Future]]:
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self._window
+        while len(batch) < self._max_batch:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self) -> None:
+        while True:
+            batch = self._collect()
+            if self._executor is None:
+                self._encode(batch)
+            else:
+                self._executor.submit(self._encode, batch)
+
+    def _encode(self, batch: list[tuple[str, Future]]) -> None:
+        try:
+            rows = self._encode_fn([text for text, _ in batch])
+        except Exception as e:
+            for _, future in batch:
+                future.set_exception(e)
+            return
+        for (_, future), row in zip(batch, rows):
+            future.set_result(row)
@@ -0,0 +1,108 @@
+"""
+migrate_collection.py — Move an existing collection between storage profiles.
+
+Usage
+-----
+python migrate_collection.py --list                   # profiles + estimated RAM for this collection
+python migrate_collection.py int8-scalar              # migrate in place, wait until green
+python migrate_collection.py on-disk --no-wait
+
+Profiles live in config.COLLECTION_PROFILES. The migration runs through
+update_collection, so the collection stays online while Qdrant rebuilds
+quantized copies and moves segments. Afterwards set COLLECTION_PROFILE to the
+same name so searches use that profile's hnsw_ef / rescoring / oversampling.
+"""
+
+import argparse
+import sys
+import time
+
+import config
+import database_manager
+
+
+def estimate_ram_bytes(profile: dict, points: int, dim: int = config.EMBEDDING_DIM) -> int:
+    """Rough resident size of the dense vectors + HNSW graph (payload and sparse index excluded)."""
+    per_vector = 0 if profile["on_disk"] else dim * 4
+    if profile["quantization"] == "int8":
+        per_vector += dim
+    elif profile["quantization"] == "binary":
+        per_vector += dim // 8
+    if not profile["hnsw_on_disk"]:
+        per_vector += profile["hnsw_m"] * 2 * 4     # level-0 links, 4-byte ids
+    return int(points * per_vector * 1.5)           # ~50% headroom for segments / optimizer
+
+
+def _current_layout(info) -> str:
+    text = info.config.params.vectors["text"]
+    quant = text.quantization_config or info.config.quantization_config
+    hnsw = text.hnsw_config or info.config.hnsw_config
+    return (
+        f"on_disk={bool(text.on_disk)} quantization={type(quant).__name__ if quant else None} "
+        f"hnsw_m={hnsw.m} ef_construct={hnsw.ef_construct} on_disk_payload={info.config.params.on_disk_payload}"
+    )
+
+
+def list_profiles(points: int) -> None:
+    print(f"{'profile':<16}{'quantization':<14}{'vectors':<10}{'graph':<8}{'est. RAM':>12}")
+    for name, profile in config.COLLECTION_PROFILES.items():
+        gib = estimate_ram_bytes(profile, points) / 2**30
+        print(
+            f"{name:<16}{str(profile['quantization']):<14}"
+            f"{'disk' if profile['on_disk'] else 'RAM':<10}{'disk' if profile['hnsw_on_disk'] else 'RAM':<8}"
+            f"{gib:>10.2f} GiB"
+        )
+    print(f"(estimates for {points:,} points of {config.EMBEDDING_DIM} dims)")
+
+
+def wait_until_green(poll_seconds: float) -> None:
+    client = database_manager.get_client()
+    while True:
+        info = client.get_collection(config.COLLECTION_NAME)
+        status = str(getattr(info.status, "value", info.status))
+        if status == "green":
+            return
+        print(f"[migrate] status={status} optimizer={info.optimizer_status} indexed={info.indexed_vectors_count}")
+        time.sleep(poll_seconds)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Migrate the Qdrant collection to another storage profile")
+    parser.add_argument("profile", nargs="?", choices=list(config.COLLECTION_PROFILES), help="target profile")
+    parser.add_argument("--collection", default=config.COLLECTION_NAME, help="collection to migrate")
+    parser.add_argument("--list", action="store_true", help="show profiles with RAM estimates and exit")
+    parser.add_argument("--points", type=int, help="point count for --list (default: the collection's)")
+    parser.add_argument("--no-wait", action="store_true", help="return without waiting for status green")
+    parser.add_argument("--poll", type=float, default=5.0, help="seconds between status polls")
+    args = parser.parse_args()
+
+    config.COLLECTION_NAME = args.collection
+    if args.list:
+        list_profiles(args.points if args.points is not None else database_manager.collection_count())
+        return
+    if args.profile is None:
+        parser.error("a target profile is required (or --list)")
+
+    client = database_manager.get_client()
+    if not client.collection_exists(config.COLLECTION_NAME):
+        sys.exit(f"[migrate] Collection '{config.COLLECTION_NAME}' does not exist; ensure_collection creates "
+                 f"new collections with COLLECTION_PROFILE directly.")
+
+    info = client.get_collection(config.COLLECTION_NAME)
+    profile = config.COLLECTION_PROFILES[args.profile]
+    print(f"[migrate] {config.COLLECTION_NAME}: {info.points_count:,} points")
+    print(f"[migrate] current: {_current_layout(info)}")
+    print(f"[migrate] target:  {args.profile} (est. {estimate_ram_bytes(profile, info.points_count) / 2**30:.2f} GiB RAM)")
+
+    t0 = time.perf_counter()
+    database_manager.migrate_collection(args.profile)
+    if not args.no_wait:
+        wait_until_green(args.poll)
+        print(f"[migrate] now:     {_current_layout(client.get_collection(config.COLLECTION_NAME))}")
+        print(f"[migrate] Done in {time.perf_counter() - t0:.1f}s")
+    if config.COLLECTION_PROFILE != args.profile:
+        print(f"[migrate] Set COLLECTION_PROFILE={args.profile} for the API so searches use this profile's parameters.")
+
+
+if __name__ == "__main__":
+    main()
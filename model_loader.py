@@ -2,102 +2,554 @@
 model_loader.py — Shared loader for Dense (BGE-M3) and Sparse (BM25) models.
 """
 
+import asyncio
+import fcntl
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING, Iterable, Iterator
+
+import httpx
 import numpy as np
 import requests
+from requests.adapters import HTTPAdapter
+from qdrant_client.models import SparseVector
+
 import config
+import metrics
+import worker_pool
+from inference_loop import InferenceLoop
+from micro_batcher import MicroBatcher
+
+# torch / sentence_transformers / fastembed are imported inside the loaders, only
+# when that backend is first used (TEI-mode workers never import torch).
+if TYPE_CHECKING:
+    from FlagEmbedding import BGEM3FlagModel
+    from fastembed import SparseTextEmbedding
+    from sentence_transformers import SentenceTransformer
+
+# Every singleton below is loaded single-flight: a fast unlocked check, then a
+# re-check under its lock, so a burst of concurrent first requests loads once.
 
 # Dense Model (SentenceTransformers)
-from sentence_transformers import SentenceTransformer
-_dense_model: SentenceTransformer | None = None
+_dense_model: "SentenceTransformer | None" = None
+_dense_model_lock = threading.Lock()
 
 # Sparse Model (FastEmbed)
 # We use FastEmbed because Qdrant's sparse vectors are typically generated using it (or Splade)
-try:
-    from fastembed import SparseTextEmbedding
-    _sparse_model: SparseTextEmbedding | None = None
-except ImportError:
-    _sparse_model = None
-    print("[model_loader] Warning: 'fastembed' not installed. Sparse mode will fail.")
+_sparse_model: "SparseTextEmbedding | None" = None
+_sparse_model_lock = threading.Lock()
+
+# BGE-M3 multi-head model (FlagEmbedding), used when ENCODER_MODE == 'bge-m3'
+_m3_model: "BGEM3FlagModel | None" = None
+_m3_model_lock = threading.Lock()
+
+# TEI clients (pooled, keep-alive — one TCP/TLS handshake per pooled connection, not per call)
+_tei_session: requests.Session | None = None
+_tei_session_lock = threading.Lock()
+_tei_async_client: httpx.AsyncClient | None = None
+_tei_executor: ThreadPoolExecutor | None = None
+_tei_executor_lock = threading.Lock()
 
+# Query coalescing (concurrent single-text encode_dense calls share one batch)
+_dense_batcher: MicroBatcher | None = None
+_dense_batcher_lock = threading.Lock()
 
-def get_dense_model() -> SentenceTransformer:
+# Continuous batching loop for the local dense model (INFERENCE_LOOP_ENABLED)
+_inference_loop: InferenceLoop | None = None
+_inference_loop_lock = threading.Lock()
+
+
+def get_dense_model() -> "SentenceTransformer":
     global _dense_model
     if _dense_model is None:
-        use_fp16 = config.DEVICE == "cuda"
-        precision = "fp16" if use_fp16 else "fp32"
-        print(f"[model_loader] Loading Dense Model ({config.MODEL_NAME}) on {config.DEVICE} ({precision})…")
-        _dense_model = SentenceTransformer(config.MODEL_NAME, device=config.DEVICE)
-        if use_fp16:
-            _dense_model.half()
+        with _dense_model_lock:
+            if _dense_model is None:
+                with metrics.timed_load("dense_model"):
+                    model = load_dense_model(config.DENSE_BACKEND, config.ONNX_QUANTIZE)
+                    model.max_seq_length = config.DENSE_MAX_SEQ_LENGTH
+                _dense_model = model
     return _dense_model
 
 
+def load_dense_model(backend: str = "torch", quantize: bool = False) -> "SentenceTransformer":
+    """Build a fresh dense model on the given backend ('torch' or 'onnx')."""
+    if backend == "onnx":
+        return _load_onnx_dense_model(quantize)
+
+    from sentence_transformers import SentenceTransformer
+
+    use_fp16 = config.DEVICE == "cuda"
+    precision = "fp16" if use_fp16 else "fp32"
+    print(f"[model_loader] Loading Dense Model ({config.MODEL_NAME}) on {config.DEVICE} ({precision})…")
+    model = SentenceTransformer(config.MODEL_NAME, device=config.DEVICE)
+    if use_fp16:
+        model.half()
+    return model
+
+
+def _load_onnx_dense_model(quantize: bool) -> "SentenceTransformer":
+    """
+    ONNX Runtime dense model for CPU nodes. The first call exports the model
+    (and optionally a dynamic int8 quantised copy) under ONNX_EXPORT_DIR;
+    later loads reuse the exported files.
+    """
+    from sentence_transformers import SentenceTransformer
+
+    export_dir = os.path.join(config.ONNX_EXPORT_DIR, config.MODEL_NAME.replace("/", "__"))
+    model_kwargs = {"provider": "CPUExecutionProvider"}
+    precision = "fp32"
+    if quantize:
+        suffix = f"qint8_{config.ONNX_QUANT_CONFIG}"
+        model_kwargs["file_name"] = f"onnx/model_{suffix}.onnx"
+        precision = f"int8 ({config.ONNX_QUANT_CONFIG})"
+
+    # Embedding workers and API processes start together: one exports while the
+    # others wait on the lock, so nobody loads a half-written model file
+    os.makedirs(config.ONNX_EXPORT_DIR, exist_ok=True)
+    with open(f"{export_dir}.lock", "a") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        if not os.path.exists(os.path.join(export_dir, "onnx", "model.onnx")):
+            print(f"[model_loader] Exporting {config.MODEL_NAME} to ONNX at {export_dir}…")
+            SentenceTransformer(config.MODEL_NAME, device="cpu", backend="onnx").save_pretrained(export_dir)
+        if quantize and not os.path.exists(os.path.join(export_dir, model_kwargs["file_name"])):
+            from sentence_transformers import export_dynamic_quantized_onnx_model
+            print(f"[model_loader] Quantising ONNX model ({config.ONNX_QUANT_CONFIG})…")
+            export_dynamic_quantized_onnx_model(
+                SentenceTransformer(export_dir, device="cpu", backend="onnx"),
+                config.ONNX_QUANT_CONFIG,
+                export_dir,
+                file_suffix=suffix,
+            )
+
+    print(f"[model_loader] Loading Dense Model ({config.MODEL_NAME}) on ONNX Runtime CPU ({precision})…")
+    return SentenceTransformer(export_dir, device="cpu", backend="onnx", model_kwargs=model_kwargs)
+
+
 def get_sparse_model():
     """Load Qdrant/bm25 (or Splade) from FastEmbed."""
     global _sparse_model
     if _sparse_model is None:
-        print(f"[model_loader] Loading Sparse Model (Qdrant/bm25)…")
-        # Snapshot says 'bm25', so likely Qdrant/bm25 or Qdrant/bm42
-        # If it fails, we fall back to Splade
-        try:
-            from fastembed import SparseTextEmbedding
-            # Using standard BM25 model supported by Qdrant
-            _sparse_model = SparseTextEmbedding(model_name="Qdrant/bm25") 
-        except Exception as e:
-            print(f"[model_loader] Failed to load sparse model: {e}")
-            raise e
+        with _sparse_model_lock:
+            if _sparse_model is None:
+                with metrics.timed_load("sparse_model"):
+                    _sparse_model = _load_sparse_model()
     return _sparse_model
 
 
-def encode_dense(texts: list[str], batch_size: int | None = None) -> np.ndarray:
-    """Encode text into dense vectors (truncated if needed)."""
-    if config.USE_TEI:
-        if isinstance(texts, str):
-            texts = [texts]
-            
+def _load_sparse_model() -> "SparseTextEmbedding":
+    print(f"[model_loader] Loading Sparse Model ({config.SPARSE_MODEL_NAME})…")
+    # Snapshot says 'bm25', so likely Qdrant/bm25 or Qdrant/bm42
+    # If it fails, we fall back to Splade
+    try:
+        from fastembed import SparseTextEmbedding
+    except ImportError:
+        print("[model_loader] Warning: 'fastembed' not installed. Sparse mode will fail.")
+        raise
+    try:
+        # Using standard BM25 model supported by Qdrant
+        return SparseTextEmbedding(model_name=config.SPARSE_MODEL_NAME)
+    except Exception as e:
+        print(f"[model_loader] Failed to load sparse model: {e}")
+        raise e
+
+
+def get_bge_m3_model() -> "BGEM3FlagModel":
+    """Load BGE-M3 with its dense, lexical (sparse) and ColBERT heads."""
+    global _m3_model
+    if _m3_model is None:
+        with _m3_model_lock:
+            if _m3_model is None:
+                with metrics.timed_load("bge_m3_model"):
+                    _m3_model = _load_bge_m3_model()
+    return _m3_model
+
+
+def _load_bge_m3_model() -> "BGEM3FlagModel":
+    try:
+        from FlagEmbedding import BGEM3FlagModel
+    except ImportError:
+        print("[model_loader] Warning: 'FlagEmbedding' not installed. ENCODER_MODE='bge-m3' will fail.")
+        raise
+    use_fp16 = config.DEVICE == "cuda"
+    precision = "fp16" if use_fp16 else "fp32"
+    print(f"[model_loader] Loading BGE-M3 multi-head model ({config.MODEL_NAME}) on {config.DEVICE} ({precision})…")
+    return BGEM3FlagModel(config.MODEL_NAME, use_fp16=use_fp16, devices=config.DEVICE)
+
+
+def encode_bge_m3(
+    texts: list[str],
+    return_sparse: bool = True,
+    return_colbert: bool = False,
+    batch_size: int | None = None,
+) -> dict:
+    """
+    One BGE-M3 forward pass for all requested heads.
+
+    Returns {"dense": ndarray (truncated to EMBEDDING_DIM), "sparse": [SparseVector],
+    "colbert": [ndarray (tokens, 1024)]}; keys only for the heads requested.
+    """
+    if config.EMBED_WORKERS > 0:
+        return worker_pool.encode_bge_m3(texts, return_sparse, return_colbert, batch_size)
+    out = get_bge_m3_model().encode(
+        list(texts),
+        batch_size=batch_size or config.BATCH_SIZE,
+        max_length=config.DENSE_MAX_SEQ_LENGTH,
+        return_dense=True,
+        return_sparse=return_sparse,
+        return_colbert_vecs=return_colbert,
+    )
+    result = {"dense": _truncate(np.asarray(out["dense_vecs"], dtype=np.float32))}
+    if return_sparse:
+        result["sparse"] = [_lexical_to_sparse(w) for w in out["lexical_weights"]]
+    if return_colbert:
+        result["colbert"] = [np.asarray(v, dtype=np.float32) for v in out["colbert_vecs"]]
+    return result
+
+
+def _lexical_to_sparse(weights: dict) -> SparseVector:
+    """Map BGE-M3 lexical weights ({token_id: weight}) onto a Qdrant SparseVector."""
+    items = sorted((int(token_id), float(w)) for token_id, w in weights.items())
+    return SparseVector(
+        indices=[token_id for token_id, _ in items],
+        values=[w for _, w in items],
+    )
+
+
+def get_tei_session() -> requests.Session:
+    """Return a singleton requests.Session with a keep-alive pool sized for TEI."""
+    global _tei_session
+    if _tei_session is None:
+        with _tei_session_lock:
+            if _tei_session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=1, pool_maxsize=config.TEI_POOL_SIZE)
+                session.mount("http://", adapter)
+                session.mount("https://", adapter)
+                _tei_session = session
+    return _tei_session
+
+
+def get_async_tei_client() -> httpx.AsyncClient:
+    """Return a singleton httpx.AsyncClient for calling TEI from async endpoints (event-loop only)."""
+    global _tei_async_client
+    if _tei_async_client is None:
+        _tei_async_client = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=config.TEI_POOL_SIZE,
+                max_keepalive_connections=config.TEI_POOL_SIZE,
+                keepalive_expiry=config.TEI_KEEPALIVE_EXPIRY,
+            ),
+            timeout=httpx.Timeout(config.TEI_READ_TIMEOUT, connect=config.TEI_CONNECT_TIMEOUT),
+        )
+    return _tei_async_client
+
+
+async def close_tei_clients() -> None:
+    """Close pooled TEI connections (called on API shutdown)."""
+    global _tei_session, _tei_async_client
+    if _tei_session is not None:
+        _tei_session.close()
+        _tei_session = None
+    if _tei_async_client is not None:
+        await _tei_async_client.aclose()
+        _tei_async_client = None
+
+
+def _chunks(texts: list[str]) -> list[list[str]]:
+    n = config.TEI_CHUNK_SIZE
+    return [texts[i:i + n] for i in range(0, len(texts), n)]
+
+
+def _retryable(e: Exception) -> bool:
+    if isinstance(e, (requests.HTTPError, httpx.HTTPStatusError)):
+        status = e.response.status_code
+        return status == 429 or status >= 500
+    return isinstance(e, (requests.ConnectionError, requests.Timeout, httpx.TransportError))
+
+
+def _backoff(attempt: int) -> float:
+    """Full-jitter exponential backoff, in seconds."""
+    return random.uniform(0, config.TEI_RETRY_BACKOFF * 2 ** attempt)
+
+
+def get_tei_executor() -> ThreadPoolExecutor:
+    """Thread pool shared by all sync TEI chunk requests, one thread per pooled connection."""
+    global _tei_executor
+    with _tei_executor_lock:
+        if _tei_executor is None:
+            _tei_executor = ThreadPoolExecutor(config.TEI_POOL_SIZE, thread_name_prefix="tei")
+    return _tei_executor
+
+
+def _tei_embed(texts: list[str]) -> np.ndarray:
+    """Split into TEI_CHUNK_SIZE chunks, keep TEI_MAX_CONCURRENCY of this call's in flight, reassemble in order."""
+    chunks = _chunks(texts)
+    if len(chunks) == 1:
+        return _tei_post(chunks[0])
+    # Per-call window (as on the async path): a slot frees when one of our chunks finishes
+    slots = threading.BoundedSemaphore(config.TEI_MAX_CONCURRENCY)
+    futures = []
+    for chunk in chunks:
+        slots.acquire()
+        future = get_tei_executor().submit(_tei_post, chunk)
+        future.add_done_callback(lambda _: slots.release())
+        futures.append(future)
+    return np.concatenate([f.result() for f in futures])
+
+
+def _tei_post(texts: list[str]) -> np.ndarray:
+    for attempt in range(config.TEI_MAX_RETRIES + 1):
         try:
-            response = requests.post(
+            response = get_tei_session().post(
                 config.TEI_URL,
                 json={"inputs": texts},
-                timeout=30
+                timeout=(config.TEI_CONNECT_TIMEOUT, config.TEI_READ_TIMEOUT),
             )
             response.raise_for_status()
-            embeddings = np.array(response.json(), dtype=np.float32)
+            return np.array(response.json(), dtype=np.float32)
         except Exception as e:
+            if attempt < config.TEI_MAX_RETRIES and _retryable(e):
+                time.sleep(_backoff(attempt))
+                continue
             print(f"[model_loader] TEI Server failed at {config.TEI_URL}. Error: {e}")
             raise e
-    else:
-        model = get_dense_model()
-        bs = batch_size or config.BATCH_SIZE
-        embeddings = model.encode(
-            texts,
-            batch_size=bs,
-            show_progress_bar=len(texts) > bs,
-            normalize_embeddings=True,
-            convert_to_numpy=True,
-        )
-        embeddings = embeddings.astype(np.float32)
 
-    # Truncate if larger (e.g. 1024 -> 512)
+
+async def _tei_embed_async(texts: list[str]) -> np.ndarray:
+    semaphore = asyncio.Semaphore(config.TEI_MAX_CONCURRENCY)
+
+    async def post(chunk: list[str]) -> np.ndarray:
+        async with semaphore:
+            return await _tei_post_async(chunk)
+
+    results = await asyncio.gather(*(post(chunk) for chunk in _chunks(texts)))
+    return np.concatenate(results)
+
+
+async def _tei_post_async(texts: list[str]) -> np.ndarray:
+    for attempt in range(config.TEI_MAX_RETRIES + 1):
+        try:
+            response = await get_async_tei_client().post(config.TEI_URL, json={"inputs": texts})
+            response.raise_for_status()
+            return np.array(response.json(), dtype=np.float32)
+        except Exception as e:
+            if attempt < config.TEI_MAX_RETRIES and _retryable(e):
+                await asyncio.sleep(_backoff(attempt))
+                continue
+            print(f"[model_loader] TEI Server failed at {config.TEI_URL}. Error: {e}")
+            raise e
+
+
+def _truncate(embeddings: np.ndarray) -> np.ndarray:
+    """Truncate if larger (e.g. 1024 -> 512) and re-normalise."""
     if embeddings.shape[1] > config.EMBEDDING_DIM:
         embeddings = embeddings[:, :config.EMBEDDING_DIM]
         norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
         embeddings = embeddings / norms
-        
     return embeddings
 
 
+def get_dense_batcher() -> MicroBatcher:
+    """Return the singleton micro-batcher that coalesces single-query dense encodes."""
+    global _dense_batcher
+    with _dense_batcher_lock:
+        if _dense_batcher is None:
+            # TEI and worker processes serve several batches at once, so send each from
+            # a pool and keep collecting; an in-process model encodes inline
+            executor = None
+            if config.USE_TEI or config.EMBED_WORKERS > 0:
+                executor = ThreadPoolExecutor(config.TEI_POOL_SIZE, thread_name_prefix="dense-batch")
+            _dense_batcher = MicroBatcher(
+                _encode_dense_now,
+                window_ms=config.DENSE_COALESCE_WINDOW_MS,
+                max_batch=config.DENSE_COALESCE_MAX_BATCH,
+                name="dense-micro-batcher",
+                executor=executor,
+            )
+    return _dense_batcher
+
+
+def get_inference_loop() -> InferenceLoop:
+    """Return the singleton continuous-batching loop for the local dense model."""
+    global _inference_loop
+    with _inference_loop_lock:
+        if _inference_loop is None:
+            _inference_loop = InferenceLoop(
+                _encode_dense_now,
+                token_budget=config.DENSE_TOKEN_BUDGET,
+                max_batch=config.INFERENCE_MAX_BATCH,
+                max_tokens=config.DENSE_MAX_SEQ_LENGTH,
+                name="dense_inference_loop",
+            )
+    return _inference_loop
+
+
+def _use_inference_loop() -> bool:
+    return config.INFERENCE_LOOP_ENABLED and not config.USE_TEI
+
+
+def _coalesce(texts: list[str]) -> bool:
+    return len(texts) == 1 and config.DENSE_COALESCE_WINDOW_MS > 0
+
+
+def encode_dense(texts: list[str], batch_size: int | None = None, priority: str = "bulk") -> np.ndarray:
+    """
+    Encode text into dense vectors (truncated if needed).
+    `priority` ('interactive' or 'bulk') orders work in the local inference loop.
+    """
+    if isinstance(texts, str):
+        texts = [texts]
+
+    if _use_inference_loop():
+        return get_inference_loop().encode(texts, priority)
+    # Single queries are coalesced with concurrent ones; bulk lists go straight through
+    if _coalesce(texts):
+        return get_dense_batcher().encode(texts)
+    return _encode_dense_now(texts, batch_size)
+
+
+def _encode_dense_now(texts: list[str], batch_size: int | None = None) -> np.ndarray:
+    if config.USE_TEI:
+        embeddings = _tei_embed(texts)
+    elif config.EMBED_WORKERS > 0:
+        return worker_pool.encode_dense(texts)
+    elif config.ENCODER_MODE == "bge-m3":
+        # Reuse the multi-head model rather than loading BGE-M3 a second time
+        return encode_bge_m3(texts, return_sparse=False, batch_size=batch_size)["dense"]
+    else:
+        embeddings = _encode_local(texts, batch_size)
+
+    return _truncate(embeddings)
+
+
+def token_budget_batches(lengths: np.ndarray, token_budget: int, max_batch: int) -> Iterator[np.ndarray]:
+    """
+    Group texts into batches whose padded size (batch_len * longest_len) stays
+    under `token_budget`. Yields index arrays into `lengths`; texts are taken
+    longest-first, so short texts share large batches instead of being padded
+    to the longest sequence of a mixed batch.
+    """
+    order = np.argsort(-lengths, kind="stable")
+    start = 0
+    while start < len(order):
+        longest = max(int(lengths[order[start]]), 1)
+        size = max(1, min(max_batch, token_budget // longest))
+        yield order[start:start + size]
+        start += size
+
+
+def _encode_local(texts: list[str], batch_size: int | None = None) -> np.ndarray:
+    """Local model encode with length-bucketed batches; rows come back in input order."""
+    model = get_dense_model()
+    # DENSE_TOKEN_BUDGET is the real limit; the row cap only stops very short texts
+    # from forming huge batches, so it is well above BATCH_SIZE
+    max_batch = batch_size or config.DENSE_MAX_BATCH
+    if len(texts) == 1:
+        batches = [np.array([0])]
+    else:
+        input_ids = model.tokenizer(
+            texts,
+            truncation=True,
+            max_length=model.max_seq_length,
+            return_attention_mask=False,
+            return_token_type_ids=False,
+        )["input_ids"]
+        lengths = np.fromiter((len(ids) for ids in input_ids), dtype=np.int64, count=len(texts))
+        batches = list(token_budget_batches(lengths, config.DENSE_TOKEN_BUDGET, max_batch))
+
+    embeddings: np.ndarray | None = None
+    for idx in batches:
+        chunk = model.encode(
+            [texts[i] for i in idx],
+            batch_size=len(idx),
+            show_progress_bar=False,
+            normalize_embeddings=True,
+            convert_to_numpy=True,
+        )
+        if embeddings is None:
+            embeddings = np.empty((len(texts), chunk.shape[1]), dtype=np.float32)
+        embeddings[idx] = chunk
+    return embeddings
+
+
+async def encode_dense_async(
+    texts: list[str], batch_size: int | None = None, priority: str = "bulk"
+) -> np.ndarray:
+    """Async variant of encode_dense: awaits TEI directly, offloads local inference to a thread."""
+    if isinstance(texts, str):
+        texts = [texts]
+
+    if _use_inference_loop():
+        futures = get_inference_loop().submit(texts, priority)
+        return np.stack(await asyncio.gather(*(asyncio.wrap_future(f) for f in futures)))
+    if _coalesce(texts):
+        row = await asyncio.wrap_future(get_dense_batcher().submit(texts[0]))
+        return row[np.newaxis, :]
+    if not config.USE_TEI:
+        return await asyncio.to_thread(_encode_dense_now, texts, batch_size)
+    return _truncate(await _tei_embed_async(texts))
+
+
 def encode_sparse(text: str):
     """Encode a single text into a SparseVector (indices, values)."""
+    return next(encode_sparse_batch([text]))
+
+
+async def encode_sparse_async(text: str) -> SparseVector:
+    """Async variant of encode_sparse: the CPU-bound encode runs in a worker thread."""
+    return await asyncio.to_thread(encode_sparse, text)
+
+
+def encode_sparse_batch(
+    texts: Iterable[str],
+    batch_size: int | None = None,
+    parallel: int | None = None,
+) -> Iterator[SparseVector]:
+    """
+    Encode many texts into SparseVectors, streaming results in input order.
+
+    FastEmbed batches the texts through the ONNX session and, when
+    `parallel` is set, fans the batches out over worker processes
+    (0 = one per core). With ENCODER_MODE='bge-m3' the vectors are BGE-M3
+    lexical weights instead.
+    """
+    if config.EMBED_WORKERS > 0:
+        yield from _encode_sparse_workers(texts, batch_size or config.SPARSE_BATCH_SIZE)
+        return
+    if config.ENCODER_MODE == "bge-m3":
+        yield from _encode_sparse_m3(texts, batch_size or config.SPARSE_BATCH_SIZE)
+        return
+
     model = get_sparse_model()
-    # FastEmbed returns a generator of sparse vectors
-    # We take the first one since we encode one by one here for search
-    embedding_gen = model.embed([text])
-    sparse_vec = next(embedding_gen)
-    
-    # Qdrant expects SparseVector(indices=..., values=...)
-    from qdrant_client.models import SparseVector
-    return SparseVector(
-        indices=sparse_vec.indices.tolist(),
-        values=sparse_vec.values.tolist()
-    )
+    bs = batch_size or config.SPARSE_BATCH_SIZE
+    workers = parallel if parallel is not None else config.SPARSE_PARALLEL
+    for sparse_vec in model.embed(texts, batch_size=bs, parallel=workers):
+        # Qdrant expects SparseVector(indices=..., values=...)
+        yield SparseVector(
+            indices=sparse_vec.indices.tolist(),
+            values=sparse_vec.values.tolist(),
+        )
+
+
+def _batched(texts: Iterable[str], batch_size: int) -> Iterator[list[str]]:
+    batch: list[str] = []
+    for text in texts:
+        batch.append(text)
+        if len(batch) == batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _encode_sparse_m3(texts: Iterable[str], batch_size: int) -> Iterator[SparseVector]:
+    for batch in _batched(texts, batch_size):
+        yield from encode_bge_m3(batch)["sparse"]
+
+
+def _encode_sparse_workers(texts: Iterable[str], batch_size: int) -> Iterator[SparseVector]:
+    for batch in _batched(texts, batch_size):
+        yield from worker_pool.encode_sparse(batch)
@@ -0,0 +1,84 @@
+"""
+point_export.py — Streaming serialisers for GET /points.
+
+Both formats consume database_manager.iter_points() page by page and yield
+bytes as they go, so exporting the whole collection runs in constant memory.
+
+NDJSON        one JSON object per point; each page ends with a {"next_cursor": …}
+              line, so an interrupted export resumes from the last one received.
+Arrow IPC     one record batch per scroll page (id, payload as JSON text and,
+              optionally, the dense vector as fixed_size_list<float32>); each
+              batch carries its resume cursor in custom metadata "next_cursor".
+"""
+
+import io
+import json
+from typing import Any, Iterable, Iterator
+
+import numpy as np
+
+import config
+
+Pages = Iterable[tuple[list[dict], Any]]
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+ARROW_MEDIA_TYPE = "application/vnd.apache.arrow.stream"
+
+
+def parse_cursor(cursor: str | None) -> int | str | None:
+    """Qdrant point ids are unsigned ints or UUIDs; query strings are always text."""
+    if cursor is None or cursor == "":
+        return None
+    return int(cursor) if cursor.isdigit() else cursor
+
+
+def ndjson_stream(pages: Pages) -> Iterator[bytes]:
+    sent = False
+    for points, next_cursor in pages:
+        lines = [json.dumps(p) for p in points] + [json.dumps({"next_cursor": next_cursor})]
+        yield ("\n".join(lines) + "\n").encode()
+        sent = True
+    if not sent:
+        yield (json.dumps({"next_cursor": None}) + "\n").encode()
+
+
+def arrow_available() -> bool:
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def arrow_stream(pages: Pages, with_vectors: bool) -> Iterator[bytes]:
+    import pyarrow as pa
+
+    fields = [pa.field("id", pa.string()), pa.field("payload", pa.string())]
+    if with_vectors:
+        fields.append(pa.field("vector", pa.list_(pa.float32(), config.EMBEDDING_DIM)))
+    schema = pa.schema(fields)
+
+    # The writer appends to `buf`; drain it after every batch so nothing accumulates
+    buf = io.BytesIO()
+    writer = pa.ipc.new_stream(buf, schema)
+
+    def drain() -> bytes:
+        data = buf.getvalue()
+        buf.seek(0)
+        buf.truncate()
+        return data
+
+    for points, next_cursor in pages:
+        columns = [
+            pa.array([p["id"] for p in points], pa.string()),
+            pa.array([json.dumps(p["payload"]) for p in points], pa.string()),
+        ]
+        if with_vectors:
+            flat = np.asarray([p["vector"] for p in points], dtype=np.float32).reshape(-1)
+            columns.append(pa.FixedSizeListArray.from_arrays(pa.array(flat), config.EMBEDDING_DIM))
+        batch = pa.RecordBatch.from_arrays(columns, schema=schema)
+        writer.write_batch(batch, custom_metadata={"next_cursor": json.dumps(next_cursor)})
+        yield drain()
+
+    writer.close()
+    yield drain()
@@ -0,0 +1,147 @@
+"""
+projection.py — Server-side 2D/3D projection of the dense vectors for visualisation.
+
+Instead of shipping every 512-float vector to the client, GET /projection
+returns ids, coordinates and a few payload fields. Large collections are
+sampled (stratified on a payload field so small categories stay visible), and
+results are cached until the collection's point count changes or
+PROJECTION_CACHE_TTL expires (overwriting points keeps the count unchanged).
+"""
+
+import random
+import threading
+import time
+from collections import defaultdict
+from typing import Any
+
+import numpy as np
+
+import config
+import database_manager
+
+METHODS = ("pca", "random", "umap")
+
+_cache: dict[tuple, dict] = {}
+_cache_lock = threading.Lock()
+
+
+def _field(payload: dict | None, path: str) -> Any:
+    """Dotted-path payload lookup; list values stratify on their first element."""
+    value: Any = payload or {}
+    for key in path.split("."):
+        value = value.get(key) if isinstance(value, dict) else None
+    if isinstance(value, list):
+        value = value[0] if value else None
+    return value
+
+
+def _qdrant_id(point_id: str) -> int | str:
+    return int(point_id) if point_id.isdigit() else point_id
+
+
+def stratified_sample(ids: list[str], strata: list[Any], size: int, seed: int = 0) -> list[str]:
+    """
+    Pick `size` ids with each stratum represented in proportion to its share
+    (at least one id per stratum). Deterministic for a given input and seed.
+    """
+    if len(ids) <= size:
+        return list(ids)
+    groups: dict[Any, list[str]] = defaultdict(list)
+    for point_id, stratum in zip(ids, strata):
+        groups[stratum].append(point_id)
+
+    rng = random.Random(seed)
+    picked: list[str] = []
+    for members in groups.values():
+        quota = max(1, round(len(members) * size / len(ids)))
+        picked.extend(rng.sample(members, min(quota, len(members))))
+    if len(picked) > size:
+        picked = rng.sample(picked, size)
+    return picked
+
+
+def _sample_points(sample_size: int, stratify: str, points_count: int) -> list[dict]:
+    """
+    Choose the sample and fetch its vectors. Uniform samples come straight from
+    Qdrant's random sampling; stratified ones read ids plus the stratify field
+    (no vectors), from a full scroll up to PROJECTION_SCAN_MAX points and from
+    a random PROJECTION_SCAN_MAX-point sample beyond that.
+    """
+    payload = config.PROJECTION_PAYLOAD_FIELDS
+    if not stratify:
+        return database_manager.sample_points(sample_size, with_vectors=True, with_payload=payload)
+
+    if points_count <= config.PROJECTION_SCAN_MAX:
+        candidates = [p for page, _ in database_manager.iter_points(with_payload=[stratify]) for p in page]
+    else:
+        candidates = database_manager.sample_points(config.PROJECTION_SCAN_MAX, with_payload=[stratify])
+    ids = stratified_sample(
+        [p["id"] for p in candidates], [_field(p["payload"], stratify) for p in candidates], sample_size
+    )
+    return database_manager.retrieve_points([_qdrant_id(i) for i in ids], with_vectors=True, with_payload=payload)
+
+
+def reduce(vectors: np.ndarray, method: str, dims: int, seed: int = 0) -> np.ndarray:
+    """Project (n, d) vectors down to (n, dims)."""
+    if len(vectors) <= dims + 1:
+        method = "random"   # too few points to fit PCA / UMAP
+    if method == "pca":
+        from sklearn.decomposition import PCA
+        return PCA(n_components=dims, random_state=seed).fit_transform(vectors)
+    if method == "random":
+        rng = np.random.default_rng(seed)
+        components = rng.standard_normal((vectors.shape[1], dims)).astype(np.float32) / np.sqrt(dims)
+        return (vectors - vectors.mean(axis=0)) @ components
+    if method == "umap":
+        try:
+            import umap
+        except ImportError as e:
+            raise RuntimeError("UMAP projection needs 'umap-learn' (pip install umap-learn)") from e
+        return umap.UMAP(n_components=dims, metric="cosine", random_state=seed).fit_transform(vectors)
+    raise ValueError(f"Unknown projection method '{method}' (expected one of {METHODS})")
+
+
+def project(
+    method: str | None = None,
+    dims: int = 2,
+    sample_size: int | None = None,
+    stratify: str | None = None,
+) -> dict:
+    """
+    Ids, `dims`-D coordinates and PROJECTION_PAYLOAD_FIELDS for (a stratified
+    sample of) the collection. Cached per point count and request parameters,
+    for at most PROJECTION_CACHE_TTL seconds.
+    """
+    method = method or config.PROJECTION_METHOD
+    sample_size = sample_size or config.PROJECTION_MAX_POINTS
+    stratify = config.PROJECTION_STRATIFY_FIELD if stratify is None else stratify
+    if method not in METHODS:
+        raise ValueError(f"Unknown projection method '{method}' (expected one of {METHODS})")
+
+    points_count = database_manager.collection_count()
+    key = (points_count, method, dims, sample_size, stratify)
+    with _cache_lock:
+        cached, cached_at = _cache.get(key, (None, 0.0))
+    if cached is not None and time.monotonic() - cached_at < config.PROJECTION_CACHE_TTL:
+        return cached
+
+    points = _sample_points(sample_size, stratify, points_count)
+    vectors = np.asarray([p["vector"] for p in points], dtype=np.float32).reshape(len(points), config.EMBEDDING_DIM)
+    coords = reduce(vectors, method, dims) if len(points) else np.empty((0, dims), dtype=np.float32)
+    print(f"[projection] {method.upper()} {dims}D of {len(points)} / {points_count} points")
+
+    result = {
+        "method": method,
+        "dims": dims,
+        "points_count": points_count,
+        "sampled": len(points),
+        "ids": [p["id"] for p in points],
+        "coords": np.round(coords.astype(np.float64), 5).tolist(),
+        "payload": [p["payload"] for p in points],
+    }
+    with _cache_lock:
+        # Entries for an older point count can never be hit again
+        for stale in [k for k in _cache if k[0] != points_count]:
+            del _cache[stale]
+        _cache[key] = (result, time.monotonic())
+    return result
@@ -5,45 +5,408 @@ Combines model_loader and database_manager into simple public functions
 that the API and UI layers can call.
 """
 
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+
 import numpy as np
 import config
 import model_loader
 import database_manager
+import embedding_store
+from database_manager import BatchQuery, PayloadSelection
 from qdrant_client.models import SparseVector
+from query_cache import QueryEmbeddingCache, normalize_query
+
+SEARCH_MODES = ("dense", "sparse", "hybrid")
+
+_query_cache = QueryEmbeddingCache(config.QUERY_CACHE_SIZE, config.QUERY_CACHE_TTL)
+
+# Runs the dense half of a hybrid query encode while the caller does the sparse half
+_encode_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="query-encode")
+
+
+# Queries are encoded in their normalised form (the form the cache is keyed on),
+# so a cache hit and a fresh encode always yield the same vector
+def _cache_key(query: str, mode: str) -> tuple:
+    model_name = config.SPARSE_ENCODER_ID if mode == "sparse" else config.MODEL_NAME
+    return (normalize_query(query), model_name, config.EMBEDDING_DIM, mode)
+
+
+def _cache_dense(key: tuple, vec: np.ndarray) -> np.ndarray:
+    vec.setflags(write=False)
+    _query_cache.put(key, vec)
+    return vec
+
+
+def _encode_query(query: str, mode: str) -> np.ndarray | SparseVector:
+    """Encode a query, serving repeats from the query-embedding cache."""
+    text = normalize_query(query)
+    key = _cache_key(text, mode)
+    vec = _query_cache.get(key)
+    if vec is None:
+        if mode == "sparse":
+            vec = model_loader.encode_sparse(text)
+            _query_cache.put(key, vec)
+        else:
+            vec = _cache_dense(key, model_loader.encode_dense([text], priority="interactive")[0])
+    return vec
+
+
+def _encode_hybrid_query(query: str) -> tuple[np.ndarray, SparseVector]:
+    """Dense + sparse query vectors: one BGE-M3 pass, or both encoders concurrently."""
+    if config.ENCODER_MODE == "bge-m3":
+        dense_key, sparse_key = _cache_key(query, "dense"), _cache_key(query, "sparse")
+        dense, sparse = _query_cache.get(dense_key), _query_cache.get(sparse_key)
+        if dense is None or sparse is None:
+            heads = model_loader.encode_bge_m3([normalize_query(query)])
+            dense = _cache_dense(dense_key, heads["dense"][0])
+            sparse = heads["sparse"][0]
+            _query_cache.put(sparse_key, sparse)
+        return dense, sparse
+
+    dense_future = _encode_executor.submit(_encode_query, query, "dense")
+    sparse = _encode_query(query, "sparse")
+    return dense_future.result(), sparse
+
+
+async def _encode_query_async(query: str, mode: str) -> np.ndarray | SparseVector:
+    """Async _encode_query: TEI is awaited directly, local inference runs off the event loop."""
+    text = normalize_query(query)
+    key = _cache_key(text, mode)
+    vec = _query_cache.get(key)
+    if vec is None:
+        if mode == "sparse":
+            vec = await model_loader.encode_sparse_async(text)
+            _query_cache.put(key, vec)
+        else:
+            vec = _cache_dense(key, (await model_loader.encode_dense_async([text], priority="interactive"))[0])
+    return vec
+
+
+async def _encode_hybrid_query_async(query: str) -> tuple[np.ndarray, SparseVector]:
+    if config.ENCODER_MODE == "bge-m3":
+        return await asyncio.to_thread(_encode_hybrid_query, query)
+    dense, sparse = await asyncio.gather(
+        _encode_query_async(query, "dense"),
+        _encode_query_async(query, "sparse"),
+    )
+    return dense, sparse
+
+
+def query_cache_stats() -> dict:
+    return _query_cache.stats()
+
 
+def clear_query_cache() -> int:
+    return _query_cache.clear()
 
-def search(query: str, top_k: int | None = None, mode: str | None = None) -> tuple[list[dict], np.ndarray | SparseVector]:
+
+def search(
+    query: str,
+    top_k: int | None = None,
+    mode: str | None = None,
+    with_payload: PayloadSelection | None = None,
+    filters: dict | None = None,
+) -> tuple[list[dict], np.ndarray | SparseVector]:
     """
-    Encode the query and run Top-K search using 'sparse' (keyword) or 'dense' (semantic) vectors.
+    Encode the query and run Top-K search using 'sparse' (keyword), 'dense' (semantic)
+    or 'hybrid' (both, fused server-side by Qdrant) vectors. `with_payload` comes
+    from database_manager.payload_selector(); None means the default profile.
+    `filters` is a structured must / should / must_not filter (see
+    database_manager.build_filter), applied by Qdrant during the search.
     """
     mode = mode or config.SEARCH_MODE
     k = top_k or config.TOP_K
-    
+    query_filter = database_manager.build_filter(filters)
+
+    # Hybrid: dense + sparse prefetch fused in one Qdrant round-trip
+    if mode == "hybrid":
+        print(f"[search] Using HYBRID ({config.HYBRID_FUSION.upper()}) search for: '{query}'")
+        dense_vec, sparse_vec = _encode_hybrid_query(query)
+        results = database_manager.search_hybrid(
+            dense_vec, sparse_vec, k, with_payload=with_payload, query_filter=query_filter
+        )
+        return results, dense_vec
+
     # Keyword search (BM25)
     if mode == "sparse":
         print(f"[search] Using SPARSE (keyword) search for: '{query}'")
-        sparse_vec = model_loader.encode_sparse(query)
-        results = database_manager.search_sparse(sparse_vec, k)
+        sparse_vec = _encode_query(query, "sparse")
+        results = database_manager.search_sparse(sparse_vec, k, with_payload, query_filter)
         return results, sparse_vec
 
     # Default dense search (Semantic)
     else:
         print(f"[search] Using DENSE (semantic) search for: '{query}'")
-        dense_vec = model_loader.encode_dense([query])[0]
-        results = database_manager.search(dense_vec, k)
+        dense_vec = _encode_query(query, "dense")
+        results = database_manager.search(dense_vec, k, with_payload, query_filter)
+        return results, dense_vec
+
+
+async def search_async(
+    query: str,
+    top_k: int | None = None,
+    mode: str | None = None,
+    with_payload: PayloadSelection | None = None,
+    filters: dict | None = None,
+) -> tuple[list[dict], np.ndarray | SparseVector]:
+    """Async search(): same modes, filters and results, without blocking the event loop."""
+    mode = mode or config.SEARCH_MODE
+    k = top_k or config.TOP_K
+    query_filter = database_manager.build_filter(filters)
+
+    if mode == "hybrid":
+        print(f"[search] Using HYBRID ({config.HYBRID_FUSION.upper()}) search for: '{query}'")
+        dense_vec, sparse_vec = await _encode_hybrid_query_async(query)
+        results = await database_manager.search_hybrid_async(
+            dense_vec, sparse_vec, k, with_payload=with_payload, query_filter=query_filter
+        )
         return results, dense_vec
 
+    if mode == "sparse":
+        print(f"[search] Using SPARSE (keyword) search for: '{query}'")
+        sparse_vec = await _encode_query_async(query, "sparse")
+        return await database_manager.search_sparse_async(sparse_vec, k, with_payload, query_filter), sparse_vec
+
+    print(f"[search] Using DENSE (semantic) search for: '{query}'")
+    dense_vec = await _encode_query_async(query, "dense")
+    return await database_manager.search_async(dense_vec, k, with_payload, query_filter), dense_vec
+
+
+# ── Batch queries ───────────────────────────────────────
+# search_many encodes every query that misses the cache in one batched call
+# per encoder, then sends all searches in one query_batch_points round-trip.
+def _batch_specs(
+    queries: list[str],
+    modes: list[str | None] | None,
+    top_ks: list[int | None] | None,
+    with_payloads: list | None,
+    filters: list[dict | None] | None,
+) -> list[BatchQuery]:
+    """One BatchQuery per query (vectors still unset), defaults filled in."""
+    n = len(queries)
+    modes = [mode or config.SEARCH_MODE for mode in modes or [None] * n]
+    for mode in modes:
+        if mode not in SEARCH_MODES:
+            raise ValueError(f"Unknown search mode '{mode}' (expected one of {SEARCH_MODES})")
+    per_query = zip(modes, top_ks or [None] * n, with_payloads or [None] * n, filters or [None] * n)
+    return [
+        BatchQuery(mode, None, None, top_k or config.TOP_K, with_payload, database_manager.build_filter(spec))
+        for mode, top_k, with_payload, spec in per_query
+    ]
+
+
+def _lookup_many(queries: list[str], specs: list[BatchQuery]) -> tuple[dict, dict, list[str], list[str]]:
+    """Cached vectors per distinct query text, plus the texts each encoder still has to embed."""
+    dense: dict[str, np.ndarray | None] = {}
+    sparse: dict[str, SparseVector | None] = {}
+    for query, spec in zip(queries, specs):
+        if spec.mode in ("dense", "hybrid") and query not in dense:
+            dense[query] = _query_cache.get(_cache_key(query, "dense"))
+        if spec.mode in ("sparse", "hybrid") and query not in sparse:
+            sparse[query] = _query_cache.get(_cache_key(query, "sparse"))
+    dense_todo = [q for q, vec in dense.items() if vec is None]
+    sparse_todo = [q for q, vec in sparse.items() if vec is None]
+    return dense, sparse, dense_todo, sparse_todo
+
+
+def _encode_missing(dense_todo: list[str], sparse_todo: list[str]) -> tuple[np.ndarray | None, list[SparseVector]]:
+    if config.ENCODER_MODE == "bge-m3":
+        texts = list(dict.fromkeys(dense_todo + sparse_todo))
+        heads = model_loader.encode_bge_m3(texts)
+        row = {text: i for i, text in enumerate(texts)}
+        return (
+            heads["dense"][[row[q] for q in dense_todo]] if dense_todo else None,
+            [heads["sparse"][row[q]] for q in sparse_todo],
+        )
+    new_dense = model_loader.encode_dense(dense_todo, priority="interactive") if dense_todo else None
+    return new_dense, list(model_loader.encode_sparse_batch(sparse_todo))
+
+
+async def _encode_missing_async(
+    dense_todo: list[str], sparse_todo: list[str]
+) -> tuple[np.ndarray | None, list[SparseVector]]:
+    if config.ENCODER_MODE == "bge-m3" or not dense_todo:
+        return await asyncio.to_thread(_encode_missing, dense_todo, sparse_todo)
+    return await asyncio.gather(
+        model_loader.encode_dense_async(dense_todo, priority="interactive"),
+        asyncio.to_thread(lambda: list(model_loader.encode_sparse_batch(sparse_todo))),
+    )
+
+
+def _fill_batch(
+    queries: list[str],
+    specs: list[BatchQuery],
+    lookup: tuple[dict, dict, list[str], list[str]],
+    encoded: tuple[np.ndarray | None, list[SparseVector]],
+) -> list[BatchQuery]:
+    """Cache the freshly encoded vectors and attach each query's vectors to its spec."""
+    dense, sparse, dense_todo, sparse_todo = lookup
+    new_dense, new_sparse = encoded
+    for query, vec in zip(dense_todo, new_dense if new_dense is not None else []):
+        dense[query] = _cache_dense(_cache_key(query, "dense"), vec)
+    for query, vec in zip(sparse_todo, new_sparse):
+        sparse[query] = vec
+        _query_cache.put(_cache_key(query, "sparse"), vec)
+    print(f"[search] Batch of {len(queries)} queries ({len(dense_todo)} dense / {len(sparse_todo)} sparse encodes)")
+    return [spec._replace(dense=dense.get(q), sparse=sparse.get(q)) for q, spec in zip(queries, specs)]
+
+
+def search_many(
+    queries: list[str],
+    modes: list[str | None] | None = None,
+    top_ks: list[int | None] | None = None,
+    with_payloads: list | None = None,
+    filters: list[dict | None] | None = None,
+) -> list[list[dict]]:
+    """
+    Search many queries at once; mode ('dense' / 'sparse' / 'hybrid'), top_k,
+    payload selection and filters may differ per query. Returns one result
+    list per query, in order.
+    """
+    queries = [normalize_query(q) for q in queries]
+    specs = _batch_specs(queries, modes, top_ks, with_payloads, filters)
+    lookup = _lookup_many(queries, specs)
+    encoded = _encode_missing(lookup[2], lookup[3])
+    return database_manager.search_batch(_fill_batch(queries, specs, lookup, encoded))
+
+
+async def search_many_async(
+    queries: list[str],
+    modes: list[str | None] | None = None,
+    top_ks: list[int | None] | None = None,
+    with_payloads: list | None = None,
+    filters: list[dict | None] | None = None,
+) -> list[list[dict]]:
+    queries = [normalize_query(q) for q in queries]
+    specs = _batch_specs(queries, modes, top_ks, with_payloads, filters)
+    lookup = _lookup_many(queries, specs)
+    encoded = await _encode_missing_async(lookup[2], lookup[3])
+    return await database_manager.search_batch_async(_fill_batch(queries, specs, lookup, encoded))
+
+
+# ── Documents ───────────────────────────────────────────
+def encode_documents(texts: list[str]) -> tuple[np.ndarray, list[SparseVector]]:
+    """
+    Dense + sparse vectors for documents, reusing the on-disk embedding store.
+    Only texts the store has never seen are sent through the models.
+    """
+    store = embedding_store.get_store()
+    cached = store.get_many(texts) if store else [None] * len(texts)
+    missing = [i for i, hit in enumerate(cached) if hit is None]
+
+    dense = np.empty((len(texts), config.EMBEDDING_DIM), dtype=np.float32)
+    sparse: list[SparseVector | None] = [None] * len(texts)
+    for i, hit in enumerate(cached):
+        if hit is not None:
+            dense[i], sparse[i] = hit
+
+    if missing:
+        miss_texts = [texts[i] for i in missing]
+        if config.ENCODER_MODE == "bge-m3":
+            heads = model_loader.encode_bge_m3(miss_texts)
+            new_dense, new_sparse = heads["dense"], heads["sparse"]
+        else:
+            new_dense = model_loader.encode_dense(miss_texts)
+            new_sparse = list(model_loader.encode_sparse_batch(miss_texts))
+        for j, i in enumerate(missing):
+            dense[i] = new_dense[j]
+            sparse[i] = new_sparse[j]
+        if store:
+            store.put_many(miss_texts, new_dense, new_sparse)
+
+    return dense, sparse
+
 
 def add_document(text: str) -> str:
     """
     Encode a single text and upsert it into Qdrant.
     Note: Now requires generating both Dense and Sparse vectors.
     """
-    # 1. Dense vector
-    dense = model_loader.encode_dense([text])[0]
-    
-    # 2. Sparse vector
-    sparse = model_loader.encode_sparse(text)
-    
-    uid = database_manager.add_single(text, dense, sparse)
+    dense, sparse = encode_documents([text])
+    uid = database_manager.add_single(text, dense[0], sparse[0])
     return uid
+
+
+async def add_document_async(text: str) -> str:
+    # encode_documents touches the on-disk store as well as the models: run it in a thread
+    dense, sparse = await asyncio.to_thread(encode_documents, [text])
+    return await database_manager.add_single_async(text, dense[0], sparse[0])
+
+
+def warm_up() -> dict[str, float]:
+    """
+    Exercise every hot path once before taking traffic: both encoders at
+    single-query and batch shapes, one probe search per mode, and the
+    collection itself. Bypasses the query cache. Returns per-step seconds.
+    """
+    timings: dict[str, float] = {}
+    queries = config.WARMUP_QUERIES
+
+    t0 = time.perf_counter()
+    dense = np.concatenate([model_loader.encode_dense([q]) for q in queries])
+    model_loader.encode_dense(queries)
+    timings["encode_dense"] = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    sparse = [model_loader.encode_sparse(q) for q in queries]
+    list(model_loader.encode_sparse_batch(queries))
+    timings["encode_sparse"] = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    database_manager.collection_count()
+    timings["collection"] = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    database_manager.search(dense[0], 1)
+    timings["search_dense"] = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    database_manager.search_sparse(sparse[0], 1)
+    timings["search_sparse"] = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    database_manager.search_hybrid(dense[0], sparse[0], 1)
+    timings["search_hybrid"] = time.perf_counter() - t0
+
+    return timings
+
+
+async def warm_up_async() -> dict[str, float]:
+    """
+    warm_up() for the async paths the endpoints use (TEI httpx client or local
+    offload, AsyncQdrantClient). Must run in the app's event loop, since those
+    clients bind their connection pools to the loop they first run in.
+    """
+    timings: dict[str, float] = {}
+    queries = config.WARMUP_QUERIES
+
+    t0 = time.perf_counter()
+    await model_loader.encode_dense_async(queries[:1], priority="interactive")
+    await model_loader.encode_dense_async(queries)
+    timings["encode_dense_async"] = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    await database_manager.collection_count_async()
+    timings["collection_async"] = time.perf_counter() - t0
+
+    for mode in ("dense", "sparse", "hybrid"):
+        t0 = time.perf_counter()
+        await search_async(queries[0], 1, mode)
+        timings[f"search_{mode}_async"] = time.perf_counter() - t0
+
+    return timings
+
+
+def add_documents(
+    texts: list[str],
+    payloads: list[dict] | None = None,
+    ids: list[str] | None = None,
+    wait: bool = False,
+) -> list[str]:
+    """Encode many texts (store-aware) and bulk-upsert them; payloads default to {'text': text}."""
+    dense, sparse = encode_documents(texts)
+    if payloads is None:
+        payloads = [{"text": t} for t in texts]
+    return database_manager.upsert_batch(dense, sparse, payloads, ids, wait=wait)
@@ -117,11 +117,13 @@ def api_health() -> dict | None:
 
 
 @st.cache_data(show_spinner=False)
-def api_search_cached(query: str, mode: str) -> dict | None:
-    """Cached search to make UI switching instant."""
+def api_search_cached(query: str, modes: tuple[str, ...]) -> dict[str, dict] | None:
+    """Cached search for several modes in one /search/batch call, keyed by mode."""
     try:
-        r = requests.post(f"{API_URL}/search", json={"query": query, "mode": mode}, timeout=30)
-        return r.json()
+        # 'ui' profile: only the payload fields the result cards render
+        batch = {"queries": [{"query": query, "mode": mode, "payload_profile": "ui"} for mode in modes]}
+        r = requests.post(f"{API_URL}/search/batch", json=batch, timeout=30)
+        return {item["mode"]: item for item in r.json()["results"]}
     except Exception:
         return None
 
@@ -166,14 +168,14 @@ with col_center:
 if "last_query" not in st.session_state:
     st.session_state["last_query"] = ""
 
-mode_map = {"Keyword Search (BM25)": "sparse", "Semantic Search (Vector)": "dense"}
+mode_map = {"Keyword Search (BM25)": "sparse", "Semantic Search (Vector)": "dense", "Hybrid Search (RRF)": "hybrid"}
 selected_mode_label = st.radio("Search Mode", list(mode_map.keys()), index=0, horizontal=True)
 selected_mode = mode_map[selected_mode_label]
 
 # Logic:
 # 1. If 'submitted' (Search button pressed):
 #    - Update session_state['last_query']
-#    - Fetch BOTH dense and sparse results (in parallel ideally, but sequential is fast enough)
+#    - Fetch results for every mode in one batch request
 #    - Store them in session_state
 # 2. If 'last_query' exists (user just switched radio button):
 #    - Display results from session_state based on selected_mode
@@ -183,22 +185,17 @@ if submitted and query_input:
     st.session_state["last_query"] = query_input
     
     with st.spinner("Fetching results..."):
-        # Fetch both!
-        res_sparse = api_search_cached(query_input, "sparse")
-        res_dense = api_search_cached(query_input, "dense")
-        
-        st.session_state["results_sparse"] = res_sparse
-        st.session_state["results_dense"] = res_dense
+        # Fetch all modes in one round-trip
+        res_all = api_search_cached(query_input, tuple(mode_map.values())) or {}
+        for mode in mode_map.values():
+            st.session_state[f"results_{mode}"] = res_all.get(mode)
 
 # Display Results
 if st.session_state.get("last_query"):
     query_text = st.session_state["last_query"]
     
     # Select usage data
-    if selected_mode == "sparse":
-        data = st.session_state.get("results_sparse")
-    else:
-        data = st.session_state.get("results_dense")
+    data = st.session_state.get(f"results_{selected_mode}")
     
     if data and data.get("results"):
         st.markdown(f'<p style="text-align:center;color:#9ca3af;margin:1rem 0;">'
@@ -237,6 +234,8 @@ if st.session_state.get("last_query"):
             raw_score = r["score"]
             if selected_mode == "sparse":
                 score_display = f"BM25 Score: {raw_score:.2f}"
+            elif selected_mode == "hybrid":
+                score_display = f"Fused Score: {raw_score:.4f}"
             else:
                 score_display = f"Similarity: {raw_score:.4f}"
 
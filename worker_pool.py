@@ -0,0 +1,185 @@
+"""
+worker_pool.py — Multi-process embedding workers for CPU nodes.
+
+When EMBED_WORKERS > 0, model_loader hands local dense, sparse and BGE-M3
+encoding to N spawned processes, each holding its own model copy and a slice
+of the CPU threads, so tokenisation and inference are no longer bound by the
+API process's GIL. Dense rows are written straight into a shared-memory buffer
+owned by the caller; sparse vectors (small, variable length) come back pickled.
+"""
+
+import math
+import multiprocessing as mp
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+from qdrant_client.models import SparseVector
+
+import config
+
+_pool: ProcessPoolExecutor | None = None
+_pool_lock = threading.Lock()
+
+
+# ── Worker side ─────────────────────────────────────────
+def _init_worker(threads: int) -> None:
+    # Must run before torch / onnxruntime are imported in this process
+    os.environ["OMP_NUM_THREADS"] = str(threads)
+    os.environ["MKL_NUM_THREADS"] = str(threads)
+    config.EMBED_WORKERS = 0    # workers encode in-process; never dispatch again
+
+    import model_loader
+    if config.ENCODER_MODE == "bge-m3":
+        model_loader.get_bge_m3_model()
+    else:
+        if not config.USE_TEI:
+            model_loader.get_dense_model()
+        model_loader.get_sparse_model()
+    print(f"[worker_pool] Worker {os.getpid()} ready ({threads} threads)")
+
+
+def _dense_task(texts: list[str], shm_name: str, total_rows: int, start: int) -> int:
+    import model_loader
+    emb = model_loader._encode_dense_now(texts)
+    # Attach only: the caller owns the block and unlinks it when all tasks finish
+    shm = shared_memory.SharedMemory(name=shm_name)
+    try:
+        out = np.ndarray((total_rows, config.EMBEDDING_DIM), dtype=np.float32, buffer=shm.buf)
+        out[start:start + len(texts)] = emb
+        del out     # release the buffer export before closing
+    finally:
+        shm.close()
+    return len(texts)
+
+
+def _bge_m3_task(
+    texts: list[str], shm_name: str, total_rows: int, start: int,
+    return_sparse: bool, return_colbert: bool, batch_size: int | None,
+) -> dict:
+    import model_loader
+    heads = model_loader.encode_bge_m3(texts, return_sparse, return_colbert, batch_size)
+    shm = shared_memory.SharedMemory(name=shm_name)
+    try:
+        out = np.ndarray((total_rows, config.EMBEDDING_DIM), dtype=np.float32, buffer=shm.buf)
+        out[start:start + len(texts)] = heads.pop("dense")
+        del out
+    finally:
+        shm.close()
+    if return_sparse:
+        heads["sparse"] = [
+            (np.asarray(v.indices, dtype=np.uint32), np.asarray(v.values, dtype=np.float32))
+            for v in heads["sparse"]
+        ]
+    return heads
+
+
+def _ping(_: int) -> int:
+    return os.getpid()
+
+
+def _sparse_task(texts: list[str]) -> list[tuple[np.ndarray, np.ndarray]]:
+    import model_loader
+    return [
+        (np.asarray(v.indices, dtype=np.uint32), np.asarray(v.values, dtype=np.float32))
+        for v in model_loader.encode_sparse_batch(texts)
+    ]
+
+
+# ── Caller side ─────────────────────────────────────────
+def get_pool() -> ProcessPoolExecutor:
+    """Start (once) and return the embedding worker pool."""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                workers = config.EMBED_WORKERS
+                threads = config.EMBED_WORKER_THREADS or max(1, (os.cpu_count() or 1) // workers)
+                print(f"[worker_pool] Starting {workers} embedding workers…")
+                _pool = ProcessPoolExecutor(
+                    max_workers=workers,
+                    mp_context=mp.get_context("spawn"),
+                    initializer=_init_worker,
+                    initargs=(threads,),
+                )
+    return _pool
+
+
+def start() -> None:
+    """Spawn every worker and wait until each has loaded its models."""
+    pool = get_pool()
+    list(pool.map(_ping, range(config.EMBED_WORKERS)))
+
+
+def shutdown() -> None:
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(cancel_futures=True)
+            _pool = None
+
+
+def _split(n: int) -> list[tuple[int, int]]:
+    """Spread n texts over the workers, at most EMBED_WORKER_CHUNK per task."""
+    size = max(1, min(config.EMBED_WORKER_CHUNK, math.ceil(n / config.EMBED_WORKERS)))
+    return [(i, min(i + size, n)) for i in range(0, n, size)]
+
+
+def encode_dense(texts: list[str]) -> np.ndarray:
+    """Dense embeddings (already truncated to EMBEDDING_DIM) computed by the workers."""
+    n = len(texts)
+    shm = shared_memory.SharedMemory(create=True, size=max(1, n * config.EMBEDDING_DIM * 4))
+    try:
+        pool = get_pool()
+        futures = [pool.submit(_dense_task, texts[a:b], shm.name, n, a) for a, b in _split(n)]
+        for f in futures:
+            f.result()
+        result = np.ndarray((n, config.EMBEDDING_DIM), dtype=np.float32, buffer=shm.buf).copy()
+    finally:
+        shm.close()
+        shm.unlink()
+    return result
+
+
+def encode_sparse(texts: list[str]) -> list[SparseVector]:
+    """Sparse vectors computed by the workers, in input order."""
+    pool = get_pool()
+    futures = [pool.submit(_sparse_task, texts[a:b]) for a, b in _split(len(texts))]
+    return [
+        SparseVector(indices=indices.tolist(), values=values.tolist())
+        for f in futures
+        for indices, values in f.result()
+    ]
+
+
+def encode_bge_m3(
+    texts: list[str],
+    return_sparse: bool = True,
+    return_colbert: bool = False,
+    batch_size: int | None = None,
+) -> dict:
+    """model_loader.encode_bge_m3() computed by the workers; same result layout."""
+    n = len(texts)
+    shm = shared_memory.SharedMemory(create=True, size=max(1, n * config.EMBEDDING_DIM * 4))
+    try:
+        pool = get_pool()
+        futures = [
+            pool.submit(_bge_m3_task, texts[a:b], shm.name, n, a, return_sparse, return_colbert, batch_size)
+            for a, b in _split(n)
+        ]
+        parts = [f.result() for f in futures]
+        result = {"dense": np.ndarray((n, config.EMBEDDING_DIM), dtype=np.float32, buffer=shm.buf).copy()}
+    finally:
+        shm.close()
+        shm.unlink()
+    if return_sparse:
+        result["sparse"] = [
+            SparseVector(indices=indices.tolist(), values=values.tolist())
+            for part in parts
+            for indices, values in part["sparse"]
+        ]
+    if return_colbert:
+        result["colbert"] = [v for part in parts for v in part["colbert"]]
+    return result